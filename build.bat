@@ -1,5 +1,14 @@
+@echo off
+rem Usage: build.bat [onedir]
+rem   onedir - unpacked folder build; starts faster than the single-file exe
+if /I "%~1"=="onedir" (
+    set PACK_MODE=--onedir
+) else (
+    set PACK_MODE=--onefile
+)
 
-pyinstaller --noconfirm --onefile --windowed --name "pdf-assembler" --clean ^
+pyinstaller --noconfirm %PACK_MODE% --windowed --name "pdf-assembler" --clean ^
     --hidden-import=PySide6.QtXml ^
+    --hidden-import=numpy ^
     --collect-all=fitz ^
     main.py
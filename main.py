@@ -1,14 +1,117 @@
+import time
+_START_TIME = time.perf_counter() # Start-up phases are measured from here
+
 import sys
 import os
-import fitz  # PyMuPDF
+import argparse
+import bisect
+import hashlib
+import heapq
+import importlib
+import json
+import platform
+import queue
+import re
+import shutil
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                                QHBoxLayout, QPushButton, QListWidget, QListWidgetItem, 
                                QFileDialog, QLabel, QMessageBox, QSplitter, QFrame,
                                QSlider, QSpinBox, QGroupBox, QAbstractItemView,
                                QMenu, QInputDialog, QLineEdit, QComboBox, QProgressBar,
-                               QCheckBox)
-from PySide6.QtCore import Qt, QSize, QThread, Signal, QMimeData
-from PySide6.QtGui import QIcon, QPixmap, QImage, QAction, QFont, QDrag
+                               QCheckBox, QTableWidget, QTableWidgetItem, QHeaderView)
+from PySide6.QtCore import (Qt, QSize, QThread, Signal, QMimeData, QPointF, QRectF, QTimer,
+                            QItemSelection, QItemSelectionModel, QObject)
+from PySide6.QtGui import (QIcon, QPixmap, QImage, QAction, QFont, QDrag, QPainter,
+                           QTransform, QColor)
+
+
+class StartupTimer:
+    """Start-up phase timings, measured from when main.py began executing."""
+    def __init__(self, t0):
+        self.t0 = t0
+        self.last = t0
+        self.phases = [] # (name, seconds, seconds since start)
+
+    def mark(self, name):
+        """Ends the phase running since the previous mark."""
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last, now - self.t0))
+        self.last = now
+
+    def record(self, name, seconds):
+        """Records a nested phase (e.g. a lazy import) without ending the current one."""
+        self.phases.append((name, seconds, time.perf_counter() - self.t0))
+
+    def report(self, verbose=False):
+        """Appends the timings to startup.log; prints them too when verbose."""
+        frozen = getattr(sys, 'frozen', False)
+        mode = "source"
+        if frozen:
+            # One-file builds unpack to a temp dir (_MEIPASS) before Python starts;
+            # onedir contents sit beside the exe (PyInstaller 6+: in _internal/)
+            meipass = os.path.abspath(getattr(sys, '_MEIPASS', ""))
+            exe_dir = os.path.abspath(os.path.dirname(sys.executable))
+            try:
+                mode = "onedir" if os.path.commonpath([meipass, exe_dir]) == exe_dir else "onefile"
+            except ValueError:
+                mode = "onefile" # Different drives: unpacked to the temp dir
+        record = {
+            'time': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'mode': mode,
+            'phases': [[name, round(sec, 4)] for name, sec, _ in self.phases],
+            'total': round(self.phases[-1][2], 4) if self.phases else 0
+        }
+        if verbose:
+            print(f"Start-up ({mode}):")
+            for name, sec, elapsed in self.phases:
+                print(f"  {name:<32} {sec * 1000:8.1f} ms   (t={elapsed * 1000:.1f} ms)")
+        append_log_record(os.path.join(app_data_dir(), "startup.log"), record)
+
+
+LOG_MAX_BYTES = 256 * 1024 # JSON-lines logs are trimmed to their newer half past this
+
+
+def append_log_record(path, record):
+    """Appends record as one JSON line to path, dropping the oldest lines once it grows past LOG_MAX_BYTES."""
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if os.path.getsize(path) > LOG_MAX_BYTES:
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+            with open(path, "w", encoding="utf-8") as f:
+                f.writelines(lines[len(lines) // 2:])
+    except OSError:
+        pass
+
+
+class LazyModule:
+    """Stands in for a heavy module and imports it on first attribute access."""
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(self._name)
+            self._module = module
+            STARTUP.record(f"import {self._name} (lazy)", time.perf_counter() - start)
+        return getattr(module, attr)
+
+
+STARTUP = StartupTimer(_START_TIME)
+STARTUP.mark("import Qt")
+
+# Heavy modules load on first use, after the window is up
+fitz = LazyModule("fitz")  # PyMuPDF
+np = LazyModule("numpy")
 
 # --- STYLING ---
 DARK_THEME_QSS = """
@@ -95,97 +198,400 @@ class PDFWorker(QThread):
         except Exception as e:
             self.finished.emit(e)
 
-class SaveWorker(QThread):
-    finished = Signal(bool, str) # Success, Message
-    progress = Signal(int, int) # Current, Total
+OVERLAY_COLORS = {
+    'Black': (0, 0, 0),
+    'White': (1, 1, 1),
+    'Red': (1, 0, 0),
+    'Blue': (0, 0, 1),
+    'Gray': (0.5, 0.5, 0.5)
+}
 
-    def __init__(self, items_data, source_docs, out_path, overlays):
-        super().__init__()
-        self.items_data = items_data
-        self.source_docs = source_docs
-        self.out_path = out_path
-        self.overlays = overlays # Dict: text, pos, color, size
-        self.running = True
+OVERLAY_MARGIN = 20
 
-    def run(self):
+# Preferred overlay fonts, tried first when they cover the text
+OVERLAY_FONT_PATHS = [
+    "C:/Windows/Fonts/msjh.ttc", # Microsoft JhengHei
+    "C:/Windows/Fonts/msyh.ttc", # Microsoft YaHei
+    "C:/Windows/Fonts/simsun.ttc", # SimSun
+    "C:/Windows/Fonts/arial.ttf" # Fallback
+]
+
+
+def app_data_dir():
+    """Per-user directory for caches and logs (override with PDF_ASSEMBLER_HOME)."""
+    path = os.environ.get('PDF_ASSEMBLER_HOME') or os.path.join(os.path.expanduser("~"), ".pdf-assembler")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def open_source(path, file_bytes=None):
+    """Opens a PDF or image file from memory; images are converted to PDF.
+
+    Returns (doc, filetype, bytes) where bytes re-open the same document.
+    file_bytes: the file's contents if the caller has already read them.
+    """
+    # Read into memory to avoid file lock on Windows which prevents saving/overwriting
+    if file_bytes is None:
+        with open(path, "rb") as f:
+            file_bytes = f.read()
+
+    # Get extension logic
+    ext = os.path.splitext(path)[1].lower().strip(".")
+    if not ext:
+        ext = "pdf" # Default assumption
+
+    doc = fitz.open(ext, file_bytes)
+
+    # Handle Images by converting to PDF in-memory
+    if not doc.is_pdf:
         try:
-            doc = fitz.open()
-            total = len(self.items_data)
-            
-            for i, item_data in enumerate(self.items_data):
-                if not self.running: return
+            pdf_bytes = doc.convert_to_pdf()
+            doc = fitz.open("pdf", pdf_bytes)
+            ext, file_bytes = "pdf", pdf_bytes
+            doc.set_metadata({'title': os.path.basename(path)}) # Set title from original filename
+        except Exception as img_err:
+            print(f"Conversion failed for {path}: {img_err}")
+            # Try to continue if possible, matches fitz logic
+    return doc, ext, file_bytes
 
-                doc_id = item_data['doc_id']
-                page_num = item_data['page_num']
-                rotation = item_data['rotation']
-                
-                # Find source doc
-                src_doc = None
-                for entry in self.source_docs:
-                    if entry['id'] == doc_id:
-                        src_doc = entry['doc']
-                        break
-                
-                if src_doc:
-                    doc.insert_pdf(src_doc, from_page=page_num, to_page=page_num)
-                    page = doc[-1]
-                    
-                    # Apply Rotation FIRST
-                    if rotation != 0:
-                        page.set_rotation((page.rotation + rotation) % 360)
-                    
-                    # Apply Overlay
-                    # Pass the page name (from items_data)
-                    page_name = item_data.get('text', '')
-                    self._apply_overlay(page, i + 1, total, page_name)
-
-                self.progress.emit(i + 1, total)
-            
-            # Save
-            doc.save(self.out_path, garbage=4, deflate=True)
-            doc.close()
-            self.finished.emit(True, f"檔案已成功儲存至:\n{self.out_path}")
-            
-        except Exception as e:
-            self.finished.emit(False, str(e))
 
-    def _apply_overlay(self, page, current_num, total_pages, page_name):
-        # 1. Check if enabled
-        if not self.overlays.get('enabled', False):
-            return
+def read_source(path, known_digests=()):
+    """Reads and hashes one import; makes no fitz calls, so any thread may run it.
 
-        text_templ = self.overlays.get('text', '')
-        if not text_templ: return
-        
-        # Replace placeholders
-        text = text_templ.replace('{n}', str(current_num))\
-                         .replace('{total}', str(total_pages))\
-                         .replace('{name}', str(page_name))
-        
-        pos = self.overlays.get('pos', 'Bottom-Right')
-        color_name = self.overlays.get('color', 'Black')
-        size = self.overlays.get('size', 12)
-        
-        # Color Map
-        colors = {
-            'Black': (0, 0, 0),
-            'White': (1, 1, 1),
-            'Red': (1, 0, 0),
-            'Blue': (0, 0, 1),
-            'Gray': (0.5, 0.5, 0.5)
-        }
-        rgb = colors.get(color_name, (0, 0, 0))
+    Returns {'path', 'digest'} plus the file's 'raw' bytes, unless the
+    digest is in known_digests (the editor reuses that document).
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    loaded = {'path': path, 'digest': hashlib.sha1(raw).hexdigest()}
+    if loaded['digest'] not in known_digests:
+        loaded['raw'] = raw
+    return loaded
 
-        # --- Use Unrotated Coordinates + Derotation ---
-        rect = page.rect
-        w = rect.width
-        h = rect.height
-        
-        margin = 20
+
+def parse_source(loaded, opened=None, prepare=None):
+    """Opens a read_source result; PyMuPDF is not thread-safe, so one thread at a time.
+
+    Replaces 'raw' with 'doc', 'filetype', 'bytes', 'key' (the journal's
+    thumbnail key) and 'stat' ((size, mtime_ns), or None for converted
+    images); prepare(loaded) then runs on the open document. opened
+    (digest -> result) shares one result between identical files.
+    """
+    if 'raw' not in loaded:
+        return loaded
+    shared = opened.get(loaded['digest']) if opened is not None else None
+    if shared is not None:
+        return shared
+    path = loaded['path']
+    doc, ext, file_bytes = open_source(path, loaded.pop('raw'))
+    st = os.stat(path)
+    # Exports re-read unchanged, unconverted files instead of copying the bytes
+    converted = ext != (os.path.splitext(path)[1].lower().strip(".") or "pdf")
+    loaded.update(doc=doc, filetype=ext, bytes=file_bytes, key=SessionJournal.source_key(path),
+                  stat=None if converted else (st.st_size, st.st_mtime_ns))
+    if prepare:
+        prepare(loaded)
+    if opened is not None:
+        opened[loaded['digest']] = loaded
+    return loaded
+
+
+def format_size(num_bytes):
+    for unit in ("B", "KB", "MB"):
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.2f} GB"
+
+
+# Columns of the resource usage panel: (key in each document row, header)
+USAGE_COLUMNS = [
+    ('path', "檔案 (File)"), ('pages', "頁數 (Pages)"), ('raw_bytes', "原始資料 (Raw)"),
+    ('handles', "開啟 (Handles)"), ('thumbs', "縮圖 (Thumbs)"), ('thumb_bytes', "縮圖大小 (Thumb Size)"),
+    ('icons', "圖示 (Icons)"), ('icon_bytes', "圖示大小 (Icon Size)"), ('main_items', "主要 (Main)"),
+    ('staging_items', "預備 (Staging)"), ('history_records', "歷史 (History)"),
+]
+
+
+def process_rss():
+    """Resident set size of this process in bytes, or None where unsupported."""
+    try:
+        if sys.platform.startswith("win"):
+            import ctypes
+            from ctypes import wintypes
+
+            class ProcessMemoryCounters(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                    (name, ctypes.c_size_t) for name in (
+                        "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage",
+                        "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage",
+                        "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+            counters = ProcessMemoryCounters()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+            return None
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None # macOS and others: no cheap current-RSS source
+
+
+def system_font_dirs():
+    home = os.path.expanduser("~")
+    if sys.platform.startswith("win"):
+        windir = os.environ.get('WINDIR', "C:/Windows")
+        local = os.environ.get('LOCALAPPDATA', os.path.join(home, "AppData", "Local"))
+        return [os.path.join(windir, "Fonts"), os.path.join(local, "Microsoft", "Windows", "Fonts")]
+    if sys.platform == "darwin":
+        return ["/System/Library/Fonts", "/Library/Fonts", os.path.join(home, "Library", "Fonts")]
+    return ["/usr/share/fonts", "/usr/local/share/fonts",
+            os.path.join(home, ".fonts"), os.path.join(home, ".local", "share", "fonts")]
+
+
+class FontIndex:
+    """On-disk index of installed fonts and their Unicode coverage.
+
+    The first run scans the system font directories; later runs reuse the
+    stored entries and only re-read fonts whose size or mtime changed.
+    """
+    VERSION = 1
+    FONT_EXTS = ('.ttf', '.ttc', '.otf')
+    STYLE_WORDS = {'regular', 'book', 'bold', 'italic', 'oblique', 'light', 'medium'}
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path=None, font_dirs=None):
+        self.path = path or os.path.join(app_data_dir(), "font_index.json")
+        self.font_dirs = font_dirs if font_dirs is not None else system_font_dirs()
+        self.fonts = {} # Key: font path, Value: {family, style, size, mtime, ranges}
+        self._order = [] # Font paths, most preferred first
+        self._starts = {} # Key: font path, Value: range starts (for bisect)
+
+    @classmethod
+    def shared(cls):
+        """Process-wide index, loaded (and refreshed) on first use."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                index = cls()
+                index.load()
+                cls._shared = index
+            return cls._shared
+
+    def load(self):
+        cached = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                cached = data.get('fonts', {})
+        except (OSError, ValueError):
+            pass
+
+        fonts = {}
+        changed = False
+        for fp, st in self._scan_files():
+            entry = cached.get(fp)
+            if not entry or entry['size'] != st.st_size or entry['mtime'] != st.st_mtime:
+                entry = self._read_font(fp, st)
+                changed = True
+            fonts[fp] = entry
+
+        self._set_fonts(fonts)
+        if changed or len(fonts) != len(cached):
+            self.save()
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({'version': self.VERSION, 'fonts': self.fonts}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Font index not saved: {e}")
+
+    def _scan_files(self):
+        for font_dir in self.font_dirs:
+            for root, _, files in os.walk(font_dir):
+                for name in files:
+                    if name.lower().endswith(self.FONT_EXTS):
+                        fp = os.path.join(root, name).replace("\\", "/")
+                        try:
+                            yield fp, os.stat(fp)
+                        except OSError:
+                            continue
+
+    def _read_font(self, fp, st):
+        entry = {'family': '', 'style': '', 'size': st.st_size, 'mtime': st.st_mtime, 'ranges': []}
+        try:
+            font = fitz.Font(fontfile=fp)
+        except Exception:
+            return entry # Unreadable fonts stay indexed (empty) so they are not re-read
+
+        words = font.name.split()
+        style = [w for w in words if w.lower() in self.STYLE_WORDS - {'regular', 'book'}]
+        entry['family'] = " ".join(w for w in words if w.lower() not in self.STYLE_WORDS)
+        entry['style'] = " ".join(style) or "Regular"
+        if font.is_bold and 'Bold' not in entry['style']:
+            entry['style'] = (entry['style'].replace("Regular", "") + " Bold").strip()
+        if font.is_italic and 'Italic' not in entry['style']:
+            entry['style'] = (entry['style'].replace("Regular", "") + " Italic").strip()
+
+        # Store coverage as [start, end] ranges to keep the index small
+        ranges = []
+        for cp in sorted(font.valid_codepoints()):
+            if ranges and cp == ranges[-1][1] + 1:
+                ranges[-1][1] = cp
+            else:
+                ranges.append([cp, cp])
+        entry['ranges'] = ranges
+        return entry
+
+    def _set_fonts(self, fonts):
+        self.fonts = fonts
+        self._starts = {fp: [r[0] for r in e['ranges']] for fp, e in fonts.items()}
+
+        preferred = [p.lower() for p in OVERLAY_FONT_PATHS]
+        def rank(fp):
+            low = fp.lower()
+            pref = preferred.index(low) if low in preferred else len(preferred)
+            return (pref, fonts[fp]['style'] != "Regular", fp)
+        self._order = sorted((fp for fp, e in fonts.items() if e['ranges']), key=rank)
+
+    def covers(self, fp, codepoints):
+        ranges = self.fonts[fp]['ranges']
+        starts = self._starts[fp]
+        for cp in codepoints:
+            i = bisect.bisect_right(starts, cp) - 1
+            if i < 0 or ranges[i][1] < cp:
+                return False
+        return True
+
+    def find(self, chars):
+        """Path of the most preferred font covering every character, or None."""
+        codepoints = sorted({ord(c) for c in chars if c.isprintable()})
+        for fp in self._order:
+            if self.covers(fp, codepoints):
+                return fp
+        return None
+
+
+def parse_page_ranges(expr, page_count):
+    """Parses "1-50, 80, 120-" into 0-based page indices (in the given order).
+
+    "-10" means pages 1..10 and "120-" means 120 to the last page. Raises
+    ValueError for malformed parts or pages outside 1..page_count.
+    """
+    pages = []
+    for part in expr.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                start_s, end_s = (s.strip() for s in part.split("-", 1))
+                start = int(start_s) if start_s else 1
+                end = int(end_s) if end_s else page_count
+            else:
+                start = end = int(part)
+        except ValueError:
+            raise ValueError(f"無法解析頁碼範圍: {part}")
+        if not (1 <= start <= page_count and 1 <= end <= page_count):
+            raise ValueError(f"頁碼超出範圍 (1-{page_count}): {part}")
+        step = 1 if end >= start else -1
+        pages.extend(range(start - 1, end - 1 + step, step))
+    return pages
+
+
+class OverlayLayout:
+    """Overlay settings resolved once per export.
+
+    Colour, font and glyph advances are resolved up front, and placements
+    are cached per output page geometry, so each page only formats its text
+    and looks up where to put it.
+    """
+    def __init__(self, overlays):
+        self.enabled = bool(overlays.get('enabled', False)) and bool(overlays.get('text', ''))
+        self.text_templ = overlays.get('text', '')
+        self.pos = overlays.get('pos', 'Bottom-Right')
+        self.size = overlays.get('size', 12)
+        self.rgb = OVERLAY_COLORS.get(overlays.get('color', 'Black'), (0, 0, 0))
+
+        self.font = None
+        self.font_file = None
+        self._font_ready = False
+        self._advances = {} # Key: char, Value: advance at fontsize 1
+        self._widths = {} # Key: width pattern, Value: width in points
+        self._placements = {} # Key: (rotation, mediabox, cropbox) of the output page
+        self._digit_key = None
+
+    def _load_font(self, chars):
+        # One index lookup for a font covering every character of the export
+        fp = FontIndex.shared().find(chars)
+        if fp:
+            try:
+                self.font = fitz.Font(fontfile=fp)
+                self.font_file = fp
+            except Exception:
+                pass
+        self._font_ready = True
+
+        # If all digits share one advance (tabular figures), "7 / 120" and
+        # "3 / 450" measure the same, so widths can be cached per pattern.
+        digits = "0123456789"
+        if len({self._advance(c) for c in digits}) == 1:
+            self._digit_key = str.maketrans(digits, "0" * len(digits))
+
+    def _advance(self, char):
+        adv = self._advances.get(char)
+        if adv is None:
+            if self.font:
+                adv = self.font.glyph_advance(ord(char))
+            else:
+                # Fallback Estimation: Chinese ~ size, ASCII ~ 0.5*size
+                adv = 1.0 if ord(char) > 255 else 0.5
+            self._advances[char] = adv
+        return adv
+
+    def format_text(self, current_num, total_pages, page_name):
+        return self.text_templ.replace('{n}', str(current_num))\
+                              .replace('{total}', str(total_pages))\
+                              .replace('{name}', str(page_name))
+
+    def text_width(self, text):
+        key = text.translate(self._digit_key) if self._digit_key else text
+        width = self._widths.get(key)
+        if width is None:
+            width = sum(self._advance(c) for c in key) * self.size
+            self._widths[key] = width
+        return width
+
+    def prepare(self, items_data, first_num=1, total=None):
+        """Batch pass before the save loop: load the font and measure every text.
+
+        Placements are left to placement(), which needs the output page's
+        own derotation matrix (it depends on the cropbox as well).
+        """
+        if not self.enabled:
+            return
+        total = total or len(items_data)
+        texts = [self.format_text(first_num + i, total, item_data.get('text', ''))
+                 for i, item_data in enumerate(items_data)]
+        if not self._font_ready:
+            self._load_font(set(self.text_templ).union(*texts))
+        for text in texts:
+            self.text_width(text)
+
+    def _compute_placement(self, w, h, rotation, derotation):
+        margin = OVERLAY_MARGIN
+        size = self.size
+        pos = self.pos
         vx, vy = 0, 0 # Visual coordinates
         align = 0 # 0=left, 1=center, 2=right
-        
-        # 2. Calculate Visual Position (vx, vy)
+
         # vy calculation (Vertical)
         if 'Top' in pos:
             vy = margin + size # Approx baseline
@@ -193,7 +599,7 @@ class SaveWorker(QThread):
             vy = h - margin
         else: # Middle
             vy = (h / 2) + (size * 0.35) # Approx vertical center adjustment
-            
+
         # vx calculation (Horizontal)
         if 'Left' in pos:
             vx = margin
@@ -205,73 +611,1347 @@ class SaveWorker(QThread):
             vx = w / 2
             align = 1
 
-        # 3. Adjust vx for Alignment (Text Width)
-        # Try finding a suitable Chinese font for calculation
-        font_paths = [
-            "C:/Windows/Fonts/msjh.ttc", # Microsoft JhengHei
-            "C:/Windows/Fonts/msyh.ttc", # Microsoft YaHei
-            "C:/Windows/Fonts/simsun.ttc", # SimSun
-            "C:/Windows/Fonts/arial.ttf" # Fallback
-        ]
-        
-        font = None
-        font_file_used = None
-        
-        for fp in font_paths:
-            if os.path.exists(fp):
-                try:
-                    font = fitz.Font(fontfile=fp)
-                    font_file_used = fp
-                    break
-                except:
-                    continue
-        
-        if font:
-            width = font.text_length(text, fontsize=size)
-        else:
-            # Better Fallback Estimation: Chinese ~ size, ASCII ~ 0.5*size
-            width = sum(size if ord(c) > 255 else size * 0.5 for c in text)
+        # Text needs to rotate WITH page rotation logic because insert_text is CCW and Page is CW
+        return (vx, vy, align, derotation, rotation)
+
+    def placement(self, page):
+        rect = page.rect
+        key = (page.rotation, tuple(page.mediabox), tuple(page.cropbox))
+        placed = self._placements.get(key)
+        if placed is None:
+            placed = self._compute_placement(rect.width, rect.height, page.rotation, page.derotation_matrix)
+            self._placements[key] = placed
+        return placed
+
+    def _origin(self, page, text):
+        """Visual start of the baseline, text width, derotation and text rotation."""
+        if not self._font_ready:
+            self._load_font(text)
+        vx, vy, align, derotation, text_rot = self.placement(page)
 
+        # Adjust vx for Alignment (Text Width)
+        width = self.text_width(text)
         if align == 2: # Right aligned
             vx -= width
         elif align == 1: # Center aligned
             vx -= (width / 2)
-            
-        # 4. Transform Visual Point (vx, vy) -> Physical Point (px, py)
-        # Use derotation_matrix to map Visual -> Physical
-        p_vis = fitz.Point(vx, vy)
-        mat = page.derotation_matrix
-        p_phys = p_vis * mat
-        
-        # 5. Calculate Text Rotation
-        # Text needs to rotate WITH page rotation logic because insert_text is CCW and Page is CW
-        # Logic: We want Visual Right -> Physical Transformed.
-        # Analysis shows text_rot = page.rotation provides correct orientation (0->0, 90->90, 180->180, 270->270)
-        text_rot = page.rotation
-        
+        return vx, vy, width, derotation, text_rot
+
+    def visual_rect(self, page, current_num, total_pages, page_name):
+        """Area (in the page's visual coordinates) the overlay text covers, or None."""
+        if not self.enabled:
+            return None
+        text = self.format_text(current_num, total_pages, page_name)
+        vx, vy, width, _, _ = self._origin(page, text)
+        return fitz.Rect(vx, vy - self.size, vx + width, vy + self.size * 0.35)
+
+    def apply(self, page, current_num, total_pages, page_name):
+        if not self.enabled:
+            return
+
+        text = self.format_text(current_num, total_pages, page_name)
+        vx, vy, width, derotation, text_rot = self._origin(page, text)
+
+        # Transform Visual Point (vx, vy) -> Physical Point (px, py)
+        p_phys = fitz.Point(vx, vy) * derotation
+        self._insert(page, p_phys, text, self.size, text_rot)
+
+    def apply_in_cell(self, sheet, cell, page_w, page_h, current_num, total_pages, page_name):
+        """Overlay for a page drawn upright and scaled into `cell` of an imposed sheet."""
+        if not self.enabled:
+            return
+        text = self.format_text(current_num, total_pages, page_name)
+        if not self._font_ready:
+            self._load_font(text)
+        key = (page_w, page_h, 'cell')
+        placed = self._placements.get(key)
+        if placed is None:
+            placed = self._compute_placement(page_w, page_h, 0, fitz.Matrix(1, 0, 0, 1, 0, 0))
+            self._placements[key] = placed
+        vx, vy, align = placed[:3]
+        width = self.text_width(text)
+        vx -= width if align == 2 else width / 2 if align == 1 else 0
+        scale = cell.width / page_w
+        self._insert(sheet, fitz.Point(cell.x0 + vx * scale, cell.y0 + vy * scale), text, self.size * scale, 0)
+
+    def _insert(self, page, point, text, size, rotate):
         try:
-            if font_file_used:
+            if self.font_file:
                  # Must provide fontname when using fontfile for correct embedding/resource usage
-                 page.insert_text(p_phys, text, fontsize=size, color=rgb, rotate=text_rot, fontfile=font_file_used, fontname="cjk_custom")
+                 page.insert_text(point, text, fontsize=size, color=self.rgb, rotate=rotate, fontfile=self.font_file, fontname="cjk_custom")
             else:
-                 page.insert_text(p_phys, text, fontsize=size, color=rgb, rotate=text_rot, fontname="china-ts")
+                 page.insert_text(point, text, fontsize=size, color=self.rgb, rotate=rotate, fontname="china-ts")
         except Exception as e:
             print(f"Overlay Error: {e}")
 
 
+THUMB_BOX = (120, 160) # Thumbnail target in logical pixels, the lists' icon size
+THUMB_DRAFT_GRAY = False # Draft thumbnails in grayscale (smaller, faster for scans)
+
+
+def render_thumbnail(page, scale=1.0, draft=True):
+    """Renders a page to fit THUMB_BOX; scale is the screen's device pixel ratio.
+
+    Drafts skip annotations (and colour if THUMB_DRAFT_GRAY) so imports stay
+    fast; the sharp version for visible items includes them.
+    """
+    rect = page.rect
+    zoom = min(THUMB_BOX[0] / rect.width, THUMB_BOX[1] / rect.height) * scale
+    colorspace = fitz.csGRAY if draft and THUMB_DRAFT_GRAY else fitz.csRGB
+    return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=colorspace,
+                           alpha=False, annots=not draft)
+
+
+def embedded_thumbnail(page):
+    """Draft thumbnail from a scanned page's own /Thumb image, or None.
+
+    Rarely applies: few writers embed /Thumb images any more (mostly older
+    scanner software), and only unrotated single-image pages qualify. Other
+    pages cost one dictionary lookup and fall back to render_thumbnail,
+    where MuPDF already decodes JPEG scans at a reduced DCT scale. The
+    result is scaled to the size render_thumbnail would give.
+    """
+    if page.rotation or len(page.get_images()) != 1:
+        return None
+    kind, value = page.parent.xref_get_key(page.xref, "Thumb")
+    if kind != "xref":
+        return None
+    try:
+        pix = fitz.Pixmap(page.parent, int(value.split()[0]))
+    except Exception:
+        return None
+    # Skip thumbnails that do not match the page's shape (stale or cropped)
+    rect = page.rect
+    if not pix.width or abs(pix.height / pix.width - rect.height / rect.width) > 0.05 * rect.height / rect.width:
+        return None
+    if pix.alpha or pix.colorspace is None or pix.colorspace.n != 3:
+        pix = fitz.Pixmap(fitz.csRGB, pix, 0)
+    zoom = min(THUMB_BOX[0] / rect.width, THUMB_BOX[1] / rect.height)
+    box = (rect * fitz.Matrix(zoom, zoom)).irect
+    if (pix.width, pix.height) != (box.width, box.height):
+        pix = fitz.Pixmap(pix, box.width, box.height)
+    return pix
+
+
+class RotationWorker(QThread):
+    """Builds rotated thumbnail images off the GUI thread.
+
+    Results are emitted in batches (at most every BATCH_INTERVAL seconds) so
+    the GUI thread wraps them into icons a few hundred at a time.
+    """
+    batchReady = Signal(list) # [((doc_id, page_num, rotation), QImage), ...]
+    BATCH_INTERVAL = 0.05
+
+    def __init__(self, jobs, parent=None):
+        super().__init__(parent)
+        self.jobs = jobs # [((doc_id, page_num, rotation), base QImage), ...]
+        self.running = True
+
+    def run(self):
+        batch = []
+        last_emit = time.monotonic()
+        for key, base_img in self.jobs:
+            if not self.running:
+                return
+            tr = QTransform()
+            tr.rotate(key[2])
+            batch.append((key, base_img.transformed(tr)))
+            if time.monotonic() - last_emit >= self.BATCH_INTERVAL:
+                self.batchReady.emit(batch)
+                batch = []
+                last_emit = time.monotonic()
+        if batch:
+            self.batchReady.emit(batch)
+
+
+IMPOSE_MODES = [(None, "不拼版 (None)"), ('2up', "2 合 1 (2-up)"), ('4up', "4 合 1 (4-up)"),
+                ('booklet', "小冊子 (Booklet)")]
+IMPOSE_GAP = 12 # Points around and between the pages on a sheet
+
+
+def impose_slots(count, mode):
+    """Item indices on each output sheet in order (None leaves a cell blank).
+
+    Booklet sheets are the two sides of folded paper: page count padded to a
+    multiple of 4, outer pages on the first sheet (saddle stitch).
+    """
+    if mode == 'booklet':
+        n = -(-count // 4) * 4
+        index = lambda i: i if i < count else None
+        sheets = []
+        for k in range(n // 4):
+            sheets.append([index(n - 1 - 2 * k), index(2 * k)]) # Front
+            sheets.append([index(2 * k + 1), index(n - 2 - 2 * k)]) # Back
+        return sheets
+    per = 4 if mode == '4up' else 2
+    return [[i if i < count else None for i in range(start, start + per)] for start in range(0, count, per)]
+
+
+def impose_pages(doc, items_data, docs_by_id, layout, mode, first_num=1, total_pages=None,
+                 progress=None, is_running=None):
+    """Appends the imposed sheets of items_data to doc.
+
+    Each source page is placed with show_pdf_page, which stores it once as a
+    Form XObject and references it from every cell showing it; rotation is
+    applied in the placement and overlays are drawn on the sheet. Sheet size
+    follows the first page: 2-up and booklet on its landscape size, 4-up on
+    its portrait size. Returns False if is_running() turned false.
+    """
+    total_pages = total_pages or len(items_data)
+    placed = [] # (visual width, visual height, total rotation) per item
+    for item_data in items_data:
+        src_page = docs_by_id[item_data['doc_id']].load_page(item_data['page_num'])
+        rect = src_page.rect # Already turned by the page's own rotation
+        w, h = (rect.height, rect.width) if item_data['rotation'] % 180 else (rect.width, rect.height)
+        placed.append((w, h, (src_page.rotation + item_data['rotation']) % 360))
+    if not placed:
+        return True
+    short, long = sorted(placed[0][:2])
+    cols, rows = (2, 2) if mode == '4up' else (2, 1)
+    sheet_w, sheet_h = (short, long) if mode == '4up' else (long, short)
+    cell_w = (sheet_w - IMPOSE_GAP * (cols + 1)) / cols
+    cell_h = (sheet_h - IMPOSE_GAP * (rows + 1)) / rows
+
+    done = 0
+    for slots in impose_slots(len(items_data), mode):
+        if is_running and not is_running():
+            return False
+        sheet = doc.new_page(width=sheet_w, height=sheet_h)
+        for n, i in enumerate(slots):
+            if i is None:
+                continue
+            item_data = items_data[i]
+            page_w, page_h, rotation = placed[i]
+            scale = min(cell_w / page_w, cell_h / page_h)
+            # Centre the page in its cell
+            x = IMPOSE_GAP + (n % cols) * (cell_w + IMPOSE_GAP) + (cell_w - page_w * scale) / 2
+            y = IMPOSE_GAP + (n // cols) * (cell_h + IMPOSE_GAP) + (cell_h - page_h * scale) / 2
+            cell = fitz.Rect(x, y, x + page_w * scale, y + page_h * scale)
+            # show_pdf_page ignores /Rotate and turns counter-clockwise
+            sheet.show_pdf_page(cell, docs_by_id[item_data['doc_id']], item_data['page_num'], rotate=-rotation)
+            layout.apply_in_cell(sheet, cell, page_w, page_h, first_num + i, total_pages, item_data.get('text', ''))
+            done += 1
+            if progress:
+                progress(done)
+    return True
+
+
+# Stages an export part reports, in order
+EXPORT_STAGES = {
+    'grafting': "拼接 (Grafting)",
+    'stamping': "加印 (Stamping)",
+    'imposing': "拼版 (Imposing)",
+    'writing': "清理與寫入 (GC & Writing)",
+}
+PROGRESS_INTERVAL = 0.25 # Seconds between progress reports from an export worker
+
+
+def export_steps(pages, stamp, impose=None):
+    """Progress steps of exporting pages: one per page grafted, stamped and imposed."""
+    mode = (impose or {}).get('mode')
+    with_pages = not mode or impose.get('originals')
+    return pages * (int(bool(with_pages)) + int(bool(with_pages and stamp)) + int(bool(mode)))
+
+
+class ProgressThrottle:
+    """Forwards export progress at most every PROGRESS_INTERVAL seconds.
+
+    Stage changes and the last step always go through; reports in between
+    are dropped, so a 20k-page export sends a few dozen instead of 20k.
+    """
+    def __init__(self, send, interval=PROGRESS_INTERVAL):
+        self.send = send
+        self.interval = interval
+        self._stage = None
+        self._last = 0.0
+
+    def __call__(self, stage, current, total, grafted):
+        now = time.monotonic()
+        if stage == self._stage and current < total and now - self._last < self.interval:
+            return
+        self._stage = stage
+        self._last = now
+        self.send(stage, current, total, grafted)
+
+
+class CancelWatch:
+    """is_running() for export workers, backed by a Manager Event.
+
+    Every is_set() on the proxy is a round trip to the manager process, so
+    the event is asked at most every PROGRESS_INTERVAL seconds, not per page.
+    """
+    def __init__(self, cancel, interval=PROGRESS_INTERVAL):
+        self.cancel = cancel
+        self.interval = interval
+        self._running = True
+        self._last = None
+
+    def __call__(self):
+        now = time.monotonic()
+        if self._running and (self._last is None or now - self._last >= self.interval):
+            self._last = now
+            self._running = not self.cancel.is_set()
+        return self._running
+
+
+def _new_object_bytes(doc, first_xref):
+    """Approximate size of the objects from first_xref on: stream lengths plus per-object overhead."""
+    size = 0
+    for xref in range(first_xref, doc.xref_length()):
+        size += PageSizeEstimator.OBJECT_OVERHEAD
+        if doc.xref_is_stream(xref):
+            kind, length = doc.xref_get_key(xref, "Length")
+            if kind == 'int':
+                size += int(length)
+    return size
+
+
+def assemble_pdf(items_data, docs_by_id, out_path, layout, progress=None, is_running=None,
+                 first_num=1, total_pages=None, impose=None, stats=None):
+    """Writes the pages in items_data to out_path with rotation and overlay.
+
+    layout is an OverlayLayout. Pages are grafted first, then stamped, then
+    imposed; progress(stage, current, total, bytes grafted) is called per
+    step, counted as in export_steps. first_num/total_pages number the
+    overlay when this file is one part of a larger export. impose ({'mode':
+    '2up'/'4up'/'booklet', 'originals': bool}) writes imposed sheets instead
+    of, or after, the pages. stats, if given, receives 'stages' (seconds per
+    stage) and 'grafted' (bytes). Returns False if is_running() turned false
+    before the save.
+    """
+    report = progress or (lambda *args: None)
+    stats = stats if stats is not None else {}
+    stats.update(stages={}, grafted=0)
+    doc = fitz.open()
+    total = len(items_data)
+    total_pages = total_pages or total
+    mode = (impose or {}).get('mode')
+    with_pages = not mode or impose.get('originals')
+    stamp = with_pages and layout.enabled
+    steps = export_steps(total, layout.enabled, impose)
+    done = 0
+
+    def cancelled():
+        if is_running and not is_running():
+            doc.close()
+            return True
+        return False
+
+    placed = [] # (index in items_data, page number in doc)
+    started = time.perf_counter()
+    for i, item_data in enumerate(items_data if with_pages else []):
+        if cancelled():
+            return False
+        src_doc = docs_by_id.get(item_data['doc_id'])
+        if src_doc:
+            first_xref = doc.xref_length()
+            doc.insert_pdf(src_doc, from_page=item_data['page_num'], to_page=item_data['page_num'])
+            stats['grafted'] += _new_object_bytes(doc, first_xref)
+            rotation = item_data['rotation']
+            if rotation != 0:
+                page = doc[-1]
+                page.set_rotation((page.rotation + rotation) % 360)
+            placed.append((i, len(doc) - 1))
+        done += 1
+        report('grafting', done, steps, stats['grafted'])
+    stats['stages']['grafting'] = time.perf_counter() - started
+
+    if stamp:
+        # Lay out all overlays before the page loop
+        started = time.perf_counter()
+        layout.prepare(items_data, first_num, total_pages)
+        for n, (i, page_num) in enumerate(placed):
+            if cancelled():
+                return False
+            # Pass the page name (from items_data); placement comes from the layout
+            layout.apply(doc[page_num], first_num + i, total_pages, items_data[i].get('text', ''))
+            report('stamping', done + n + 1, steps, stats['grafted'])
+        done += total
+        stats['stages']['stamping'] = time.perf_counter() - started
+
+    if mode:
+        started = time.perf_counter()
+        first_xref = doc.xref_length()
+        if not impose_pages(doc, items_data, docs_by_id, layout, mode, first_num, total_pages,
+                            progress=lambda cur: report('imposing', done + cur, steps, stats['grafted']),
+                            is_running=is_running):
+            doc.close()
+            return False
+        stats['grafted'] += _new_object_bytes(doc, first_xref)
+        stats['stages']['imposing'] = time.perf_counter() - started
+
+    # Save (MuPDF collects garbage and writes in the same call)
+    report('writing', steps, steps, stats['grafted'])
+    started = time.perf_counter()
+    doc.save(out_path, garbage=4, deflate=True)
+    doc.close()
+    stats['stages']['writing'] = time.perf_counter() - started
+    return True
+
+
+def assemble_files(paths, out_path, overlays):
+    """Process-pool entry point: assembles whole files, in order, into out_path."""
+    docs_by_id = {}
+    items_data = []
+    for doc_id, path in enumerate(paths):
+        doc, _, _ = open_source(path)
+        docs_by_id[doc_id] = doc
+        items_data.extend({'doc_id': doc_id, 'page_num': n, 'rotation': 0, 'text': f"P{n + 1}"}
+                          for n in range(len(doc)))
+    assemble_pdf(items_data, docs_by_id, out_path, OverlayLayout(overlays))
+    return len(items_data)
+
+
+class SourceChanged(RuntimeError):
+    """A 'file' source spec no longer matches the file on disk."""
+
+    def __init__(self, path):
+        super().__init__(f"來源檔案已變更 (Source file changed on disk): {path}")
+        self.path = path
+
+
+def open_snapshot_source(spec):
+    """Opens a private copy of a source for an export job.
+
+    spec is ('file', path, (size, mtime_ns)[, fallback]) for a file that is
+    re-read from disk, or ('data', filetype, bytes) for in-memory content.
+    A file changed since the snapshot opens its fallback data spec instead;
+    without one SourceChanged is raised.
+    """
+    if spec[0] == 'file':
+        path, file_stat = spec[1:3]
+        try:
+            st = os.stat(path)
+            unchanged = (st.st_size, st.st_mtime_ns) == file_stat
+        except OSError:
+            unchanged = False
+        if unchanged:
+            return open_source(path)[0]
+        if len(spec) > 3:
+            return open_snapshot_source(spec[3])
+        raise SourceChanged(path)
+    _, filetype, data = spec
+    return fitz.open(filetype, data)
+
+
+_worker_docs = OrderedDict() # Per worker process: file spec -> open fitz.Document
+WORKER_DOC_CACHE = 4
+
+
+def worker_source(spec):
+    """open_snapshot_source with a small per-process cache for file specs, so
+    parts of one split export that share a source open it only once."""
+    if spec[0] != 'file':
+        return open_snapshot_source(spec)
+    key = tuple(spec[1:3])
+    doc = _worker_docs.get(key)
+    if doc is None:
+        doc = open_snapshot_source(spec)
+        _worker_docs[key] = doc
+        while len(_worker_docs) > WORKER_DOC_CACHE:
+            _worker_docs.popitem(last=False)[1].close()
+    _worker_docs.move_to_end(key)
+    return doc
+
+
+def run_export_job(job_id, part, sources, items_data, out_path, overlays, events, cancel,
+                   first_num=1, total_pages=None, impose=None):
+    """Export-pool entry point for one output file of a job.
+
+    sources maps doc_id -> open_snapshot_source spec. Progress goes to the
+    events queue, rate-limited, as (job_id, part, stage, current, total,
+    bytes grafted). Returns assemble_pdf's stats, or False if the job was
+    cancelled before the save.
+    """
+    docs_by_id = {doc_id: worker_source(spec) for doc_id, spec in sources.items()}
+    stats = {}
+    # Every put is a round trip to the manager process, so most are dropped
+    send = ProgressThrottle(lambda *args: events.put((job_id, part) + args))
+    ok = assemble_pdf(items_data, docs_by_id, out_path, OverlayLayout(overlays), progress=send,
+                      is_running=CancelWatch(cancel),
+                      first_num=first_num, total_pages=total_pages, impose=impose, stats=stats)
+    return stats if ok else False
+
+
+VERIFY_BOX = 96 # Longest side in pixels of the pages compared by verification
+VERIFY_TOLERANCE = 0.5 # Mean grey-level difference (0-255); intact pages render identically
+VERIFY_CHUNK = 25 # Pages per verification task
+
+
+def _grey_array(pix):
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width].astype(np.int16)
+
+
+def _overlay_drawn(out_page, src_page, rotation, area, rgb, zoom=2):
+    """Whether the overlay area of out_page differs from the same area of the source page."""
+    if area.is_empty:
+        return False
+    got = _grey_array(out_page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=area, colorspace=fitz.csGRAY, alpha=False))
+    # Map the output's visual rect back onto the source page before the extra rotation
+    mat = fitz.Matrix(1, 1).prerotate(rotation)
+    offset = (src_page.rect * mat).top_left
+    clip = (area.quad * (fitz.Matrix(1, 0, 0, 1, offset.x, offset.y) * ~mat)).rect
+    want = _grey_array(src_page.get_pixmap(matrix=fitz.Matrix(zoom, zoom).prerotate(rotation), clip=clip,
+                                           colorspace=fitz.csGRAY, alpha=False))
+    h, w = min(got.shape[0], want.shape[0]), min(got.shape[1], want.shape[1])
+    if np.abs(got[:h, :w] - want[:h, :w]).mean() > 1:
+        return True
+    # Text in the background's own colour cannot be seen, so it cannot be checked
+    grey = 255 * (0.299 * rgb[0] + 0.587 * rgb[1] + 0.114 * rgb[2])
+    return abs(want.mean() - grey) < 8 and want.std() < 4
+
+
+def verify_export_pages(out_path, sources, items_data, start, expected_pages, overlays,
+                        first_num=1, total_pages=None, cancel=None):
+    """Export-pool entry point checking items_data[start:start + VERIFY_CHUNK]
+    of a written file against its sources.
+
+    Checks the page count (first chunk only) and every page's rotation, then
+    renders output and source pages to VERIFY_BOX and compares them outside
+    the expected overlay area, where the output must differ from the source.
+    Returns [(page index in the file, reason), ...], or None if cancelled
+    before the whole range was checked.
+    """
+    out = fitz.open(out_path)
+    layout = OverlayLayout(overlays)
+    total_pages = total_pages or expected_pages
+    mismatches = []
+    running = CancelWatch(cancel) if cancel is not None else None
+    if start == 0 and len(out) != expected_pages:
+        mismatches.append((-1, f"頁數 {len(out)} ≠ {expected_pages} (page count)"))
+    for i in range(start, min(start + VERIFY_CHUNK, len(items_data))):
+        if running is not None and not running():
+            out.close()
+            return None
+        if i >= len(out):
+            mismatches.append((i, "缺頁 (missing)"))
+            continue
+        item_data = items_data[i]
+        try:
+            src_page = worker_source(sources[item_data['doc_id']]).load_page(item_data['page_num'])
+            out_page = out.load_page(i)
+            rotation = item_data['rotation'] or 0
+            if out_page.rotation != (src_page.rotation + rotation) % 360:
+                mismatches.append((i, f"旋轉 {out_page.rotation}° (rotation)"))
+                continue
+
+            zoom = VERIFY_BOX / max(out_page.rect.width, out_page.rect.height)
+            got = _grey_array(out_page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False))
+            want = _grey_array(src_page.get_pixmap(matrix=fitz.Matrix(zoom, zoom).prerotate(rotation),
+                                                   colorspace=fitz.csGRAY, alpha=False))
+            h, w = min(got.shape[0], want.shape[0]), min(got.shape[1], want.shape[1])
+            diff = np.abs(got[:h, :w] - want[:h, :w])
+            area = layout.visual_rect(out_page, first_num + i, total_pages, item_data.get('text', ''))
+            if area is not None:
+                if not _overlay_drawn(out_page, src_page, rotation, area & out_page.rect, layout.rgb):
+                    mismatches.append((i, "缺少頁碼文字 (overlay missing)"))
+                    continue
+                # The overlay is expected to differ; estimated widths get a margin
+                pad = layout.size
+                area = fitz.Rect(area.x0 - pad, area.y0 - pad, area.x1 + pad, area.y1 + pad) * fitz.Matrix(zoom, zoom)
+                diff[max(0, int(area.y0)):max(0, int(area.y1) + 1), max(0, int(area.x0)):max(0, int(area.x1) + 1)] = 0
+            # A low mean can still hide a missing image or block of text
+            if diff.mean() > VERIFY_TOLERANCE or (diff > 64).mean() > 0.001:
+                mismatches.append((i, f"內容不符 (content) {diff.mean():.0f}"))
+        except SourceChanged:
+            out.close()
+            raise # The queue retries the chunk with the loaded bytes
+        except Exception as e:
+            mismatches.append((i, f"錯誤 (error): {e}"))
+    out.close()
+    return mismatches
+
+
+def split_ranges(items_data, rule, value, page_objects=None):
+    """Splits an export into [start, end) ranges of items_data.
+
+    rule is 'pages' (every value pages), 'source' (at every change of source
+    document) or 'size' (parts of at most value bytes by page_objects(item),
+    which returns {object key: bytes}; objects shared within a part count once).
+    """
+    ranges = []
+    start = 0
+    if rule == 'pages':
+        step = max(1, int(value))
+        ranges = [(i, min(i + step, len(items_data))) for i in range(0, len(items_data), step)]
+    elif rule == 'source':
+        for i in range(1, len(items_data)):
+            if items_data[i]['doc_id'] != items_data[i - 1]['doc_id']:
+                ranges.append((start, i))
+                start = i
+        ranges.append((start, len(items_data)))
+    elif rule == 'size':
+        seen = set()
+        part_bytes = 0
+        for i, item_data in enumerate(items_data):
+            objects = page_objects(item_data)
+            added = sum(size for key, size in objects.items() if key not in seen)
+            if i > start and part_bytes + added > value:
+                ranges.append((start, i))
+                start = i
+                seen = set()
+                part_bytes = 0
+                added = sum(objects.values())
+            seen.update(objects)
+            part_bytes += added
+        ranges.append((start, len(items_data)))
+    else:
+        ranges = [(0, len(items_data))]
+    return [r for r in ranges if r[1] > r[0]]
+
+
+def part_path(out_path, part, count):
+    """name.pdf -> name_part01.pdf, zero-padded to the number of parts."""
+    base, ext = os.path.splitext(out_path)
+    return f"{base}_part{part + 1:0{max(2, len(str(count)))}d}{ext}"
+
+
+class PageSizeEstimator:
+    """Approximate bytes each source page contributes to an export.
+
+    A page costs its own object, its content streams and every object
+    reachable from its resources and annotations (fonts, images, forms).
+    Sizes are per PDF object, so callers can count objects shared by many
+    pages once. Results are cached per source page.
+    """
+    REF_RE = re.compile(r"(\d+) 0 R")
+    BACKREF_RE = re.compile(r"/(?:Parent|P)\s*\d+ 0 R") # Links back up the page tree
+    PAGE_RE = re.compile(r"/Type\s*/Page\b")
+    OBJECT_OVERHEAD = 20 # "n 0 obj"/"endobj" and the xref table entry
+
+    def __init__(self):
+        self._objects = {} # Key: (doc_id, page_num), Value: {(doc_id, xref): bytes}
+        self._xrefs = {} # Key: (doc_id, xref), Value: (bytes, referenced xrefs, is page)
+
+    def forget(self, doc_id):
+        self._objects = {k: v for k, v in self._objects.items() if k[0] != doc_id}
+        self._xrefs = {k: v for k, v in self._xrefs.items() if k[0] != doc_id}
+
+    def _xref_info(self, doc_id, doc, xref):
+        info = self._xrefs.get((doc_id, xref))
+        if info is None:
+            try:
+                obj = doc.xref_object(xref, compressed=True)
+            except Exception:
+                obj = ""
+            size = len(obj) + self.OBJECT_OVERHEAD
+            if doc.xref_is_stream(xref):
+                kind, length = doc.xref_get_key(xref, "Length")
+                if kind == 'int':
+                    size += int(length)
+                elif kind == 'xref':
+                    size += int(doc.xref_object(int(length.split()[0])) or 0)
+            refs = tuple(int(r) for r in self.REF_RE.findall(self.BACKREF_RE.sub("", obj)))
+            info = (size, refs, bool(self.PAGE_RE.search(obj)))
+            self._xrefs[(doc_id, xref)] = info
+        return info
+
+    def page_objects(self, doc_id, doc, page_num):
+        """{(doc_id, xref): bytes} for everything the page pulls into an export."""
+        key = (doc_id, page_num)
+        objects = self._objects.get(key)
+        if objects is not None:
+            return objects
+        page_xref = doc.page_xref(page_num)
+        objects = {}
+        # Page object itself; other pages (link targets) are not followed
+        size, refs, _ = self._xref_info(doc_id, doc, page_xref)
+        objects[(doc_id, page_xref)] = size
+        stack = list(refs)
+        # Resources inherited from the page tree
+        if doc.xref_get_key(page_xref, "Resources")[0] == 'null':
+            parent = doc.xref_get_key(page_xref, "Parent")
+            while parent[0] == 'xref':
+                pxref = int(parent[1].split()[0])
+                kind, res = doc.xref_get_key(pxref, "Resources")
+                if kind != 'null':
+                    stack.extend(int(r) for r in self.REF_RE.findall(res))
+                    break
+                parent = doc.xref_get_key(pxref, "Parent")
+        while stack:
+            xref = stack.pop()
+            if (doc_id, xref) in objects:
+                continue
+            size, refs, is_page = self._xref_info(doc_id, doc, xref)
+            if is_page:
+                continue
+            objects[(doc_id, xref)] = size
+            stack.extend(refs)
+        self._objects[key] = objects
+        return objects
+
+
+class ThroughputStats:
+    """Export speed measured on this machine, kept in throughput.json.
+
+    Every finished export adds (pages, output bytes, seconds, overlay); time
+    estimates fit seconds = a * pages + b * MB over the most recent samples
+    with the same overlay setting, since stamping text dominates when enabled.
+    """
+    MAX_SAMPLES = 20
+    DEFAULT_PAGE_SECONDS = 0.003 # Until the first export is measured
+    DEFAULT_MB_SECONDS = 0.05
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(app_data_dir(), "throughput.json")
+        self.samples = [] # [pages, bytes, seconds, overlay]
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.samples = json.load(f)['samples'][-self.MAX_SAMPLES:]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def record(self, pages, out_bytes, seconds, overlay):
+        if pages <= 0 or seconds <= 0:
+            return
+        self.samples = (self.samples + [[pages, out_bytes, seconds, int(overlay)]])[-self.MAX_SAMPLES:]
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({'samples': self.samples}, f)
+        except OSError:
+            pass
+
+    def matching(self, overlay):
+        return [s[:3] for s in self.samples if s[3] == int(overlay)]
+
+    def coefficients(self, overlay=False):
+        """(seconds per page, seconds per MB)."""
+        a, b = self.DEFAULT_PAGE_SECONDS, self.DEFAULT_MB_SECONDS
+        samples = self.matching(overlay) or [s[:3] for s in self.samples]
+        if not samples:
+            return a, b
+        # Least squares without intercept (2x2 normal equations)
+        spp = sum(p * p for p, _, _ in samples)
+        spm = sum(p * m / 2**20 for p, m, _ in samples)
+        smm = sum((m / 2**20) ** 2 for _, m, _ in samples)
+        spt = sum(p * t for p, _, t in samples)
+        smt = sum(m / 2**20 * t for _, m, t in samples)
+        det = spp * smm - spm * spm
+        if len(samples) >= 2 and det > 1e-9:
+            fa = (spt * smm - smt * spm) / det
+            fb = (smt * spp - spt * spm) / det
+            if fa >= 0 and fb >= 0:
+                return fa, fb
+        # Too few or degenerate samples: keep the default mix, scaled to match
+        predicted = sum(a * p + b * m / 2**20 for p, m, _ in samples)
+        scale = sum(t for _, _, t in samples) / predicted if predicted else 1
+        return a * scale, b * scale
+
+    def estimate_seconds(self, pages, out_bytes, overlay=False):
+        a, b = self.coefficients(overlay)
+        return a * pages + b * out_bytes / 2**20
+
+
+class ExportQueue(QObject):
+    """Prioritised export jobs run on a bounded pool of worker processes.
+
+    Each job carries its own snapshot of the composition, so the editor stays
+    usable while exports run. A job writes one or more parts (split export);
+    parts run in parallel. Lower priority numbers start first; jobs of equal
+    priority run in submission order. Progress from the workers is drained
+    by a timer on the GUI thread. A summary of every finished job is
+    appended to exports.log as one JSON line.
+    """
+    jobStarted = Signal(int) # Job id
+    jobProgress = Signal(int, int, int) # Job id, Current, Total
+    jobFinished = Signal(int, str, str) # Job id, State (done/failed/cancelled), Message
+    jobVerifying = Signal(int) # Job id; its first written file is being verified
+
+    def __init__(self, max_workers=None, parent=None, log_path=None):
+        super().__init__(parent)
+        self.log_path = log_path or os.path.join(app_data_dir(), "exports.log")
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) // 2))
+        self.jobs = {} # Key: job id, Value: job dict
+        self._pending = [] # Heap of (priority, job id, part)
+        self._running = {} # Key: (job id, part), Value: Future
+        self._verifying = {} # Key: (job id, part, first page), Value: Future
+        self._next_id = 1
+        self._pool = None
+        self._manager = None
+        self._events = None
+        self._timer = QTimer(self)
+        self._timer.setInterval(100)
+        self._timer.timeout.connect(self._poll)
+
+    def submit(self, name, priority, sources, items_data, out_path, overlays, ranges=None, number_per_part=False,
+               verify=False, impose=None):
+        """Queues an export; ranges splits items_data into one file per [start, end).
+
+        verify: check each written file against its sources (verify_export_pages)
+        before the job finishes; not done for imposed files.
+        impose: imposition settings passed on to assemble_pdf, per part.
+        """
+        job_id = self._next_id
+        self._next_id += 1
+        ranges = ranges or [(0, len(items_data))]
+        parts = []
+        for n, (start, end) in enumerate(ranges):
+            path = out_path if len(ranges) == 1 else part_path(out_path, n, len(ranges))
+            first, total = (1, end - start) if number_per_part else (start + 1, len(items_data))
+            parts.append({'out_path': path, 'items_data': items_data[start:end],
+                          'first_num': first, 'total_pages': total, 'state': 'queued'})
+        job = {
+            'id': job_id, 'name': name, 'priority': priority, 'state': 'queued',
+            'sources': sources, 'parts': parts, 'overlays': overlays, 'cancel': None,
+            'progress': [0] * len(parts), 'spool': [],
+            'stages': [None] * len(parts), 'grafted': [0] * len(parts), 'pages': len(items_data),
+            # Progress steps: pages grafted, stamped and imposed
+            'total': export_steps(len(items_data), overlays.get('enabled') and overlays.get('text'), impose),
+            'verify': verify and not impose, 'mismatches': [], 'impose': impose
+        }
+        if len(parts) > 1 or verify:
+            self._spool_sources(job)
+        self.jobs[job_id] = job
+        for n in range(len(parts)):
+            heapq.heappush(self._pending, (priority, job_id, n))
+        self._dispatch()
+        return job_id
+
+    def _spool_sources(self, job):
+        # In-memory sources go to disk once, so every part reads them from there
+        spool_dir = os.path.join(app_data_dir(), "spool")
+        os.makedirs(spool_dir, exist_ok=True)
+        for doc_id, spec in job['sources'].items():
+            if spec[0] != 'data':
+                continue
+            path = os.path.join(spool_dir, f"job{job['id']}_{doc_id}.{spec[1]}")
+            with open(path, "wb") as f:
+                f.write(spec[2])
+            st = os.stat(path)
+            job['sources'][doc_id] = ('file', path, (st.st_size, st.st_mtime_ns))
+            job['spool'].append(path)
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if not job:
+            return
+        if job['state'] == 'queued':
+            self._finish(job, 'cancelled', "已取消 (Cancelled)")
+        elif job['state'] == 'running':
+            job['cancel'].set() # Workers stop before the next page
+            for part in job['parts']:
+                if part['state'] == 'queued':
+                    part['state'] = 'cancelled'
+            self._check_job(job)
+
+    def status(self, job_id):
+        """Live figures of a running job: stage, pages per second, bytes grafted and ETA (seconds or None)."""
+        job = self.jobs[job_id]
+        running = [stage for stage, part in zip(job['stages'], job['parts'])
+                   if stage and part['state'] == 'running']
+        elapsed = time.monotonic() - job.get('started', time.monotonic())
+        fraction = sum(job['progress']) / job['total'] if job['total'] else 1
+        return {
+            'stage': running[0] if running else None,
+            'pages_per_second': job['pages'] * fraction / elapsed if elapsed > 0 else 0,
+            'grafted': sum(job['grafted']),
+            # Steps so far predict the rest; saving has no steps, so no ETA then
+            'eta': elapsed * (1 - fraction) / fraction if 0 < fraction < 1 else None,
+        }
+
+    def running_count(self):
+        return len(self._running) + len(self._verifying)
+
+    def shutdown(self):
+        for job in self.jobs.values():
+            if job['state'] == 'running':
+                job['cancel'].set()
+        self._pending.clear()
+        self._timer.stop()
+        if self._pool:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._manager.shutdown()
+            self._pool = None
+        for job in self.jobs.values():
+            self._remove_spool(job)
+
+    def _dispatch(self):
+        while self._pending and len(self._running) < self.max_workers:
+            _, job_id, n = heapq.heappop(self._pending)
+            job = self.jobs[job_id]
+            part = job['parts'][n]
+            if job['state'] not in ('queued', 'running') or part['state'] != 'queued':
+                continue # Cancelled while waiting
+            if self._pool is None:
+                # spawn: workers never inherit Qt state from this process
+                ctx = multiprocessing.get_context("spawn")
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx)
+                self._manager = ctx.Manager()
+                self._events = self._manager.Queue()
+            if job['state'] == 'queued':
+                job['cancel'] = self._manager.Event()
+                job['started'] = time.monotonic()
+                job['state'] = 'running'
+                self.jobStarted.emit(job_id)
+            sources = self._part_sources(job, part)
+            part['state'] = 'running'
+            try:
+                self._running[(job_id, n)] = self._pool.submit(
+                    run_export_job, job_id, n, sources, part['items_data'], part['out_path'],
+                    job['overlays'], self._events, job['cancel'], part['first_num'], part['total_pages'],
+                    job['impose'])
+            except BrokenExecutor as e:
+                self._fail_part(job, n, e)
+                self._drop_pool()
+                self._check_job(job)
+        if self._running and not self._timer.isActive():
+            self._timer.start()
+
+    def _poll(self):
+        # Only the latest progress of each job reaches the UI
+        changed = set()
+        while self._events is not None:
+            try:
+                job_id, n, stage, cur, _, grafted = self._events.get_nowait()
+            except queue.Empty:
+                break
+            job = self.jobs.get(job_id)
+            if job and job['state'] == 'running':
+                job['progress'][n] = cur
+                job['stages'][n] = stage
+                job['grafted'][n] = grafted
+                changed.add(job_id)
+        for job_id in changed:
+            job = self.jobs[job_id]
+            self.jobProgress.emit(job_id, sum(job['progress']), job['total'])
+
+        broken = False
+        for key, future in list(self._running.items()):
+            if not future.done():
+                continue
+            del self._running[key]
+            job_id, n = key
+            job = self.jobs[job_id]
+            part = job['parts'][n]
+            try:
+                try:
+                    part['stats'] = future.result()
+                except SourceChanged as e:
+                    if not self._use_fallback(job, e.path):
+                        raise
+                    # Redo the part from the bytes loaded into the editor
+                    part['state'] = 'queued'
+                    job['progress'][n], job['stages'][n], job['grafted'][n] = 0, None, 0
+                    heapq.heappush(self._pending, (job['priority'], job_id, n))
+                    continue
+                part['state'] = 'done' if part['stats'] else 'cancelled'
+                job['written'] = time.monotonic() # Verification is not export time
+                if part['state'] == 'done' and job['verify']:
+                    if job['cancel'].is_set():
+                        part['state'] = 'cancelled' # Written but never verified
+                    else:
+                        self._start_verify(job, n)
+            except Exception as e:
+                broken = broken or isinstance(e, BrokenExecutor)
+                self._fail_part(job, n, e)
+            self._check_job(job)
+
+        for key, future in list(self._verifying.items()):
+            if not future.done():
+                continue
+            del self._verifying[key]
+            job_id, n, _ = key
+            job = self.jobs[job_id]
+            part = job['parts'][n]
+            try:
+                found = future.result()
+            except SourceChanged as e:
+                if self._use_fallback(job, e.path):
+                    self._submit_verify(job, n, key[2])
+                    continue
+                found = [(-1, f"錯誤 (error): {e}")]
+            except BrokenExecutor as e:
+                part['checking'] -= 1
+                broken = True
+                if part['state'] == 'verifying':
+                    self._fail_part(job, n, e)
+                    self._check_job(job)
+                continue
+            except Exception as e:
+                found = [(-1, f"錯誤 (error): {e}")]
+            part['checking'] -= 1
+            if found is None or job['cancel'].is_set():
+                part['unchecked'] = True # Cancelled: some pages were never compared
+            else:
+                name = os.path.basename(part['out_path'])
+                job['mismatches'].extend((name, i + 1, reason) for i, reason in found)
+            if not part['checking'] and part['state'] == 'verifying':
+                part['state'] = 'cancelled' if part.get('unchecked') else 'done'
+                self._check_job(job)
+        if broken:
+            self._drop_pool()
+        self._dispatch()
+        if not self._running and not self._verifying:
+            self._timer.stop()
+
+    def _fail_part(self, job, n, error):
+        part = job['parts'][n]
+        part['state'] = 'failed'
+        part['error'] = str(error) or type(error).__name__
+        # One failed part fails the job
+        job['cancel'].set()
+        for other in job['parts']:
+            if other['state'] == 'queued':
+                other['state'] = 'cancelled'
+
+    def _drop_pool(self):
+        # A pool whose worker died stays broken; the next dispatch starts a fresh pool and manager.
+        # Jobs still holding events of the old manager keep it alive until they are dropped.
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = self._manager = self._events = None
+
+    def _start_verify(self, job, n):
+        # Verification tasks share the pool; they are queued behind running exports
+        part = job['parts'][n]
+        part['state'] = 'verifying'
+        starts = range(0, max(len(part['items_data']), 1), VERIFY_CHUNK)
+        part['checking'] = len(starts)
+        if not any(p.get('checking') for i, p in enumerate(job['parts']) if i != n):
+            self.jobVerifying.emit(job['id'])
+        for start in starts:
+            self._submit_verify(job, n, start)
+
+    def _submit_verify(self, job, n, start):
+        part = job['parts'][n]
+        self._verifying[(job['id'], n, start)] = self._pool.submit(
+            verify_export_pages, part['out_path'], self._part_sources(job, part), part['items_data'], start,
+            len(part['items_data']), job['overlays'], part['first_num'], part['total_pages'], job['cancel'])
+
+    def _part_sources(self, job, part):
+        # The fallback bytes of a file spec stay here unless the file has changed (_use_fallback)
+        used_ids = {d['doc_id'] for d in part['items_data']}
+        return {doc_id: spec[:3] for doc_id, spec in job['sources'].items() if doc_id in used_ids}
+
+    def _use_fallback(self, job, path):
+        """Switches the job's specs of a file changed on disk to their loaded bytes."""
+        changed = False
+        for doc_id, spec in job['sources'].items():
+            if spec[0] == 'file' and spec[1] == path and len(spec) > 3:
+                job['sources'][doc_id] = spec[3]
+                changed = True
+        return changed
+
+    def _check_job(self, job):
+        states = [part['state'] for part in job['parts']]
+        if job['state'] != 'running' or any(s in ('queued', 'running', 'verifying') for s in states):
+            return
+        if 'failed' in states:
+            self._finish(job, 'failed', next(p['error'] for p in job['parts'] if p['state'] == 'failed'))
+        elif 'cancelled' in states:
+            self._finish(job, 'cancelled', "已取消 (Cancelled)")
+        else:
+            if len(job['parts']) == 1:
+                msg = f"檔案已成功儲存至:\n{job['parts'][0]['out_path']}"
+            else:
+                folder = os.path.dirname(job['parts'][0]['out_path'])
+                msg = f"已儲存 {len(job['parts'])} 個檔案至:\n{folder}"
+            if job['mismatches']:
+                pages = {(name, page) for name, page, _ in job['mismatches'] if page > 0}
+                msg += f"\n驗證: {len(pages)} 頁不符 (Verification: {len(pages)} mismatching pages)"
+            elif job['verify']:
+                msg += "\n驗證通過 (Verified)"
+            self._finish(job, 'done', msg)
+
+    def _log_summary(self, job):
+        seconds = job.get('seconds', 0)
+        stage_seconds = {}
+        for part in job['parts']:
+            for stage, sec in (part.get('stats') or {}).get('stages', {}).items():
+                stage_seconds[stage] = stage_seconds.get(stage, 0) + sec # Summed over parallel parts
+        record = {
+            'time': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'host': platform.node(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'workers': self.max_workers,
+            'name': job['name'], 'state': job['state'], 'pages': job['pages'], 'parts': len(job['parts']),
+            'overlay': bool(job['overlays'].get('enabled') and job['overlays'].get('text')),
+            'impose': (job['impose'] or {}).get('mode'), 'verify': job['verify'],
+            'seconds': round(seconds, 3),
+            'verify_seconds': round(time.monotonic() - job['written'], 3) if job['verify'] and 'written' in job else 0,
+            'pages_per_second': round(job['pages'] / seconds, 1) if seconds > 0 and job['state'] == 'done' else 0,
+            'out_bytes': job['out_bytes'],
+            'grafted_bytes': sum((part.get('stats') or {}).get('grafted', 0) for part in job['parts']),
+            'stage_seconds': {stage: round(sec, 3) for stage, sec in stage_seconds.items()},
+            'mismatches': len(job['mismatches']),
+        }
+        append_log_record(self.log_path, record)
+
+    def _remove_spool(self, job):
+        for path in job['spool']:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        job['spool'] = []
+
+    def _finish(self, job, state, msg):
+        job['state'] = state
+        if 'started' in job:
+            job['seconds'] = job.get('written', time.monotonic()) - job['started']
+        job['out_bytes'] = sum(os.path.getsize(part['out_path']) for part in job['parts']
+                               if part['state'] == 'done' and os.path.exists(part['out_path']))
+        self._log_summary(job)
+        job['sources'] = None
+        for part in job['parts']:
+            part['items_data'] = None
+        self._remove_spool(job)
+        self.jobFinished.emit(job['id'], state, msg)
+
+
+class HotFolderWatcher:
+    """Watch mode: assembles groups of files dropped into a folder.
+
+    A file is settled once its size and mtime stop changing for `settle`
+    seconds. With rule "prefix" files are grouped by the first capture of
+    group_regex on the file name (default: the name without a trailing
+    sequence number) and a group is assembled once no member has arrived
+    or changed for `group_quiet` seconds, so a scanner pausing between
+    pages does not split a batch. With rule "manifest" a sidecar JSON file
+    ({"files": [...], "output": "...", "overlay": {...}}) names the members
+    (in the watched folder), output file name and overlay. Groups run in
+    parallel on a process pool; sources are then moved to done/ (or
+    failed/, with invalid manifests) under the watched folder.
+    """
+    SOURCE_EXTS = ('.pdf', '.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp', '.gif')
+    DEFAULT_GROUP_REGEX = r"^(.+?)[\s_-]*\d+$"
+
+    def __init__(self, folder, out_dir=None, overlays=None, rule="prefix", group_regex=None,
+                 settle=2.0, workers=2, interval=1.0, group_quiet=10.0):
+        self.folder = os.path.abspath(folder)
+        self.out_dir = os.path.abspath(out_dir or os.path.join(self.folder, "output"))
+        self.overlays = overlays or {'enabled': False}
+        self.rule = rule
+        self.group_re = re.compile(group_regex or self.DEFAULT_GROUP_REGEX)
+        self.settle = settle
+        self.group_quiet = max(group_quiet, settle)
+        self.interval = interval
+        self.workers = workers
+        self.pool = None
+        self._files = {} # Key: path, Value: (size, mtime, last change time)
+        self._busy = set() # Paths belonging to a running job
+        self._jobs = {} # Key: Future, Value: (group name, member paths, output path)
+        os.makedirs(self.out_dir, exist_ok=True)
+
+    def scan(self, now):
+        """Refreshes file signatures; returns {path: seconds since it last changed} for files not in a job."""
+        current = {}
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                ext = os.path.splitext(entry.name)[1].lower()
+                if ext not in self.SOURCE_EXTS and not (self.rule == "manifest" and ext == ".json"):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue # Removed while scanning
+                old = self._files.get(entry.path)
+                changed = now if old is None or old[:2] != (st.st_size, st.st_mtime) else old[2]
+                current[entry.path] = (st.st_size, st.st_mtime, changed)
+        self._files = current
+        return {path: now - sig[2] for path, sig in current.items() if path not in self._busy}
+
+    def group_key(self, path):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        m = self.group_re.match(stem)
+        return m.group(1) if m and m.groups() else stem
+
+    def read_manifest(self, path):
+        """(member paths, output file name, overlays) from a manifest; raises ValueError if invalid."""
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if not isinstance(manifest, dict):
+            raise ValueError("not a JSON object")
+        files = manifest.get('files')
+        if not isinstance(files, list) or not files or not all(isinstance(n, str) and n for n in files):
+            raise ValueError("'files' must be a non-empty list of file names")
+        output = manifest.get('output')
+        if output is not None and not isinstance(output, str):
+            raise ValueError("'output' must be a file name")
+        overlay = manifest.get('overlay', {})
+        if not isinstance(overlay, dict):
+            raise ValueError("'overlay' must be an object")
+        # Names only: members come from the watched folder and output goes to out_dir
+        members = [os.path.join(self.folder, os.path.basename(name)) for name in files]
+        name = os.path.splitext(os.path.basename(path))[0]
+        out_name = os.path.basename(output or "") or name + ".pdf"
+        return members, out_name, dict(self.overlays, **overlay)
+
+    def ready_groups(self, files):
+        """(name, member paths, output file name, overlays) for every complete group."""
+        groups = []
+        if self.rule == "manifest":
+            for path, age in sorted(files.items()):
+                if not (age >= self.settle and path.lower().endswith(".json")):
+                    continue
+                try:
+                    members, out_name, overlays = self.read_manifest(path)
+                except (OSError, ValueError) as e:
+                    print(f"Bad manifest {path}: {e}")
+                    self._move_to(path, os.path.join(self.folder, "failed"))
+                    continue
+                # Wait until every listed file has arrived and settled
+                if all(files.get(m, -1) >= self.settle for m in members):
+                    name = os.path.splitext(os.path.basename(path))[0]
+                    groups.append((name, members + [path], out_name, overlays))
+            return groups
+
+        by_key = {}
+        for path, age in files.items():
+            by_key.setdefault(self.group_key(path), []).append((path, age))
+        for key, members in sorted(by_key.items()):
+            # The whole group must be quiet, not just each file settled
+            if min(age for _, age in members) >= self.group_quiet:
+                paths = sorted(path for path, _ in members)
+                groups.append((key, paths, key + ".pdf", self.overlays))
+        return groups
+
+    def _unique_path(self, directory, name, taken=()):
+        """A free name in directory; taken holds paths reserved but not written yet."""
+        base, ext = os.path.splitext(name)
+        path = os.path.join(directory, name)
+        n = 1
+        while os.path.exists(path) or path in taken:
+            path = os.path.join(directory, f"{base} ({n}){ext}")
+            n += 1
+        return path
+
+    def _move_to(self, path, dest):
+        os.makedirs(dest, exist_ok=True)
+        try:
+            shutil.move(path, self._unique_path(dest, os.path.basename(path)))
+        except OSError as e:
+            print(f"Could not move {path}: {e}")
+
+    def poll(self):
+        """One watch cycle: collect finished jobs, then start newly completed groups."""
+        for future in [f for f in self._jobs if f.done()]:
+            name, members, out_path = self._jobs.pop(future)
+            try:
+                pages = future.result()
+                print(f"[{time.strftime('%H:%M:%S')}] {name}: {pages} pages -> {out_path}")
+                dest = os.path.join(self.folder, "done", name)
+            except Exception as e:
+                print(f"[{time.strftime('%H:%M:%S')}] {name} failed: {e}")
+                dest = os.path.join(self.folder, "failed", name)
+            for path in members:
+                self._move_to(path, dest)
+                self._busy.discard(path)
+
+        # Outputs of running jobs are only written when they finish
+        reserved = {out_path for _, _, out_path in self._jobs.values()}
+        for name, members, out_name, overlays in self.ready_groups(self.scan(time.monotonic())):
+            sources = [m for m in members if not m.lower().endswith(".json")]
+            out_path = self._unique_path(self.out_dir, out_name, reserved)
+            reserved.add(out_path)
+            future = self.pool.submit(assemble_files, sources, out_path, overlays)
+            self._jobs[future] = (name, members, out_path)
+            self._busy.update(members)
+
+    def run(self):
+        print(f"Watching {self.folder} -> {self.out_dir} ({self.rule}, {self.workers} workers)")
+        # spawn: workers never inherit Qt state from this process
+        self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        try:
+            while True:
+                try:
+                    self.poll()
+                except Exception as e:
+                    # One bad cycle (unreadable folder, odd file) must not end watch mode
+                    print(f"[{time.strftime('%H:%M:%S')}] Watch cycle failed: {e}")
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.pool.shutdown(wait=True)
+
+
+def watch_main(argv):
+    parser = argparse.ArgumentParser(prog="pdf-assembler --watch",
+                                     description="Assemble files dropped into a folder into PDFs.")
+    parser.add_argument("--watch", required=True, metavar="FOLDER", help="folder to watch")
+    parser.add_argument("--out", metavar="FOLDER", help="output folder (default: FOLDER/output)")
+    parser.add_argument("--rule", choices=["prefix", "manifest"], default="prefix",
+                        help="group files by name prefix or by sidecar JSON manifests")
+    parser.add_argument("--group-regex", help="regex whose first group is the prefix key")
+    parser.add_argument("--settle", type=float, default=2.0,
+                        help="seconds a file must stay unchanged before it is used")
+    parser.add_argument("--group-quiet", type=float, default=10.0,
+                        help="seconds no file of a prefix group may arrive or change before it is assembled")
+    parser.add_argument("--workers", type=int, default=2, help="groups assembled at once")
+    parser.add_argument("--overlay-text", help="overlay template, e.g. '{n} / {total}'")
+    parser.add_argument("--overlay-pos", default="Bottom-Right")
+    parser.add_argument("--overlay-color", default="Black", choices=list(OVERLAY_COLORS))
+    parser.add_argument("--overlay-size", type=int, default=12)
+    args = parser.parse_args(argv)
+
+    overlays = {
+        'enabled': bool(args.overlay_text),
+        'text': args.overlay_text or "",
+        'pos': args.overlay_pos,
+        'color': args.overlay_color,
+        'size': args.overlay_size
+    }
+    HotFolderWatcher(args.watch, args.out, overlays, args.rule, args.group_regex,
+                     args.settle, args.workers, group_quiet=args.group_quiet).run()
+
+
 class ThumbnailCache:
     """Cache for PDF page thumbnails to avoid reloading from disk constantly."""
     def __init__(self):
         self._cache = {} # Key: (doc_id, page_num), Value: QImage (base, 0 rotation)
+        self._icons = {} # Key: (doc_id, page_num, rotation), Value: QIcon (shared by all items)
+        self._sharp = {} # Key: (doc_id, page_num), Value: scale of the refined image
 
     def get_image(self, doc_id, page_num):
         return self._cache.get((doc_id, page_num))
 
-    def set_image(self, doc_id, page_num, image):
+    def set_image(self, doc_id, page_num, image, sharp_scale=None):
         self._cache[(doc_id, page_num)] = image
-        
+        if sharp_scale:
+            self._sharp[(doc_id, page_num)] = sharp_scale
+        else:
+            self._sharp.pop((doc_id, page_num), None)
+        # Icons derived from the old image are stale
+        for rotation in (0, 90, 180, 270):
+            self._icons.pop((doc_id, page_num, rotation), None)
+
+    def get_icon(self, doc_id, page_num, rotation):
+        return self._icons.get((doc_id, page_num, rotation))
+
+    def set_icon(self, doc_id, page_num, rotation, icon):
+        self._icons[(doc_id, page_num, rotation)] = icon
+
+    def is_sharp(self, doc_id, page_num, scale):
+        return self._sharp.get((doc_id, page_num), 0) >= scale
+
+    def usage(self):
+        """Per-document entry counts and bytes: {doc_id: {thumbs, thumb_bytes, icons, icon_bytes}}."""
+        usage = {}
+        for (doc_id, _), img in list(self._cache.items()):
+            entry = usage.setdefault(doc_id, dict.fromkeys(('thumbs', 'thumb_bytes', 'icons', 'icon_bytes'), 0))
+            entry['thumbs'] += 1
+            entry['thumb_bytes'] += img.sizeInBytes()
+        for doc_id, page_num, _ in list(self._icons):
+            entry = usage.setdefault(doc_id, dict.fromkeys(('thumbs', 'thumb_bytes', 'icons', 'icon_bytes'), 0))
+            entry['icons'] += 1
+            # Icon pixmaps hold the base image's pixels, just rotated
+            img = self._cache.get((doc_id, page_num))
+            entry['icon_bytes'] += img.sizeInBytes() if img is not None else 0
+        return usage
+
     def clear(self):
         self._cache.clear()
+        self._icons.clear()
+        self._sharp.clear()
+
+class HistoryState(list):
+    """Main-list records of one undo step; staging holds the staging list's
+    records too when the step changed it (otherwise None)."""
+    staging = None
+
 
 class HistoryManager:
     """Manages Undo & Redo History."""
@@ -279,11 +1959,13 @@ class HistoryManager:
         self.undo_stack = []
         self.redo_stack = []
         self.max_stack = max_stack
+        self._usage_memo = {} # Key: id(snapshot), Value: (snapshot, records per doc, bytes)
     
     def push_state(self, state):
         """Pushes a new state to undo stack and clears redo stack."""
         # If new state is same as last, ignore to prevent duplicate states
-        if self.undo_stack and self.undo_stack[-1] == state:
+        if (self.undo_stack and self.undo_stack[-1] == state
+                and getattr(self.undo_stack[-1], 'staging', None) == getattr(state, 'staging', None)):
             return
 
         self.undo_stack.append(state)
@@ -312,11 +1994,648 @@ class HistoryManager:
     def can_redo(self):
         return len(self.redo_stack) > 0
 
+    def measure(self, state):
+        """(records per doc, approximate bytes) of one snapshot; each is measured once."""
+        # Snapshots never change once pushed, so the result can be kept
+        cached = self._usage_memo.get(id(state))
+        if cached is None or cached[0] is not state:
+            counts = {}
+            size = sys.getsizeof(state)
+            for record in state + (getattr(state, 'staging', None) or []):
+                counts[record['doc_id']] = counts.get(record['doc_id'], 0) + 1
+                size += sys.getsizeof(record) + sys.getsizeof(record['text'])
+            cached = self._usage_memo[id(state)] = (state, counts, size)
+        return cached[1], cached[2]
+
+    def usage(self):
+        """Snapshot count, approximate bytes and records per document across both stacks."""
+        snapshots = self.undo_stack + self.redo_stack
+        live = {id(state) for state in snapshots}
+        for key in [k for k in self._usage_memo if k not in live]:
+            del self._usage_memo[key] # Don't keep dropped snapshots alive
+        total_bytes = 0
+        per_doc = {}
+        for state in snapshots:
+            counts, size = self.measure(state)
+            total_bytes += size
+            for doc_id, n in counts.items():
+                per_doc[doc_id] = per_doc.get(doc_id, 0) + n
+        return {'snapshots': len(snapshots), 'bytes': total_bytes, 'records': per_doc}
+
+class SessionJournal:
+    """Append-only log of main-list edits for autosave and crash recovery.
+
+    Each line is one JSON op: source (an imported file), snapshot, reset,
+    insert, remove, move, order (rows rearranged), set (rewritten rows) and
+    close (clean exit). A background thread does all file writes in order;
+    compact() rewrites the journal as the current sources plus one snapshot.
+    Thumbnails of each source are kept beside the journal, so recovery does
+    not re-render them.
+    """
+    COMPACT_BYTES = 1 << 20 # Appended bytes before compacting, unless the snapshot is larger
+
+    def __init__(self, folder=None):
+        self.folder = folder or os.path.join(app_data_dir(), "session")
+        os.makedirs(self.folder, exist_ok=True)
+        self.path = os.path.join(self.folder, "journal.jsonl")
+        self.bytes_written = 0 # Appended since the last compaction
+        self.snapshot_bytes = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def read(self):
+        """Ops of the previous session; [] if it closed cleanly or there is none."""
+        ops = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        ops.append(json.loads(line))
+                    except ValueError:
+                        break # Torn last line from a crash
+        except OSError:
+            return []
+        if ops and ops[-1].get('op') == 'close':
+            return []
+        return ops
+
+    @staticmethod
+    def replay(ops):
+        """Applies ops in order; returns ({source id: source op}, [[doc_id, page, rot, text]])."""
+        sources = {}
+        records = []
+        for op in ops:
+            kind = op.get('op')
+            if kind == 'source':
+                sources[op['id']] = op
+            elif kind == 'snapshot':
+                records = list(op['items'])
+            elif kind == 'reset':
+                records = []
+            elif kind == 'insert':
+                records[op['row']:op['row']] = op['items']
+            elif kind == 'remove':
+                del records[op['row']:op['row'] + op['count']]
+            elif kind == 'move':
+                moved = records[op['row']:op['row'] + op['count']]
+                del records[op['row']:op['row'] + op['count']]
+                # dest counts rows before the move, like QAbstractItemModel::rowsMoved
+                dest = op['dest'] - op['count'] if op['dest'] > op['row'] else op['dest']
+                records[dest:dest] = moved
+            elif kind == 'order':
+                records = [r for row, count in op['runs'] for r in records[row:row + count]]
+            elif kind == 'set':
+                records[op['row']:op['row'] + len(op['items'])] = op['items']
+        return sources, records
+
+    @staticmethod
+    def order_op(order):
+        """'order' op for a permutation, where order[i] is the old row now at row i.
+
+        Stored as [old row, count] runs, so moving a few rows stays a short line.
+        """
+        runs = []
+        for row in order:
+            if runs and row == runs[-1][0] + runs[-1][1]:
+                runs[-1][1] += 1
+            else:
+                runs.append([row, 1])
+        return {'op': 'order', 'runs': runs}
+
+    @staticmethod
+    def source_key(path):
+        """Stable name for a source file's thumbnails: path plus size and mtime."""
+        st = os.stat(path)
+        raw = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+    def append(self, ops):
+        lines = [json.dumps(op, ensure_ascii=False) for op in ops]
+        self._queue.put(('append', lines))
+        self.bytes_written += sum(len(line.encode("utf-8")) + 1 for line in lines)
+
+    def compact(self, sources, records):
+        """Replaces the journal with the given state; sources are source ops."""
+        lines = [json.dumps(op, ensure_ascii=False) for op in sources]
+        lines.append(json.dumps({'op': 'snapshot', 'items': records}, ensure_ascii=False))
+        self._queue.put(('rewrite', (lines, {op['key'] for op in sources if op.get('key')})))
+        self.bytes_written = 0
+        self.snapshot_bytes = sum(len(line.encode("utf-8")) + 1 for line in lines)
+
+    def should_compact(self):
+        # A compaction rewrites the snapshot, so it waits until the appended ops outweigh it
+        return self.bytes_written > max(self.COMPACT_BYTES, self.snapshot_bytes)
+
+    def close(self):
+        self.append([{'op': 'close'}])
+        self._queue.put(None)
+        self._thread.join()
+
+    def save_thumbnails(self, key, items_data):
+        self._queue.put(('thumbs', (key, items_data)))
+
+    def load_thumbnails(self, key, doc_id):
+        """Cached (doc_id, page_num, png, hash) tuples of a source, or None."""
+        try:
+            with open(os.path.join(self.folder, key + ".thumbs"), "rb") as f:
+                header = json.loads(f.readline())
+                data = f.read()
+        except (OSError, ValueError):
+            return None
+        items_data = []
+        offset = 0
+        for page_num, length, dhash in header['pages']:
+            items_data.append((doc_id, page_num, data[offset:offset + length], dhash))
+            offset += length
+        return items_data if offset == len(data) else None
+
+    def _run(self):
+        f = None
+        while True:
+            task = self._queue.get()
+            if task is None:
+                break
+            kind, data = task
+            try:
+                if kind == 'rewrite':
+                    lines, keep = data
+                    if f:
+                        f.close()
+                    tmp = self.path + ".tmp"
+                    with open(tmp, "w", encoding="utf-8") as out:
+                        out.write("\n".join(lines) + "\n")
+                        out.flush()
+                        os.fsync(out.fileno())
+                    os.replace(tmp, self.path)
+                    f = open(self.path, "a", encoding="utf-8")
+                    # Thumbnails of sources no longer in the session
+                    for name in os.listdir(self.folder):
+                        if name.endswith(".thumbs") and name[:-7] not in keep:
+                            os.remove(os.path.join(self.folder, name))
+                elif kind == 'append':
+                    if f is None:
+                        f = open(self.path, "a", encoding="utf-8")
+                    f.write("\n".join(data) + "\n")
+                    f.flush() # In the OS after each batch; survives an app crash
+                elif kind == 'thumbs':
+                    key, items_data = data
+                    header = {'pages': [[page_num, len(png), dhash] for _, page_num, png, dhash in items_data]}
+                    tmp = os.path.join(self.folder, key + ".tmp")
+                    with open(tmp, "wb") as out:
+                        out.write(json.dumps(header).encode("utf-8") + b"\n")
+                        for _, _, png, _ in items_data:
+                            out.write(png)
+                    os.replace(tmp, os.path.join(self.folder, key + ".thumbs"))
+            except OSError as e:
+                print(f"Journal write failed: {e}")
+        if f:
+            f.close()
+
+
+class TextIndex:
+    """Inverted index over the text of every imported page.
+
+    Words are lower-cased; CJK runs are indexed as character bigrams since
+    they have no spaces. Postings are compact arrays of page ids, so 50k
+    pages fit comfortably and a query is a few set intersections.
+    """
+    TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+    CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages = [] # Page id -> (doc_id, page_num)
+        self._postings = {} # Key: token, Value: array of page ids (ascending)
+        self._vocab = [] # Sorted tokens, for prefix queries
+
+    @classmethod
+    def tokenize(cls, text):
+        text = text.lower()
+        if not cls.CJK_RE.search(text):
+            return cls.TOKEN_RE.findall(text)
+        tokens = []
+        for word in cls.TOKEN_RE.findall(text):
+            pos = 0
+            for m in cls.CJK_RE.finditer(word):
+                if m.start() > pos:
+                    tokens.append(word[pos:m.start()])
+                run = m.group()
+                if len(run) == 1:
+                    tokens.append(run)
+                else:
+                    tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+                pos = m.end()
+            if pos < len(word):
+                tokens.append(word[pos:])
+        return tokens
+
+    def add_document(self, doc_id, page_texts):
+        """Index one document's pages (list of strings, in page order)."""
+        new_postings = {}
+        with self._lock:
+            first_id = len(self._pages)
+            self._pages.extend((doc_id, n) for n in range(len(page_texts)))
+        for n, text in enumerate(page_texts):
+            pid = first_id + n
+            for token in set(self.tokenize(text)):
+                new_postings.setdefault(token, []).append(pid)
+
+        with self._lock:
+            for token, pids in new_postings.items():
+                posting = self._postings.get(token)
+                if posting is None:
+                    self._postings[token] = array('I', pids)
+                else:
+                    posting.extend(pids)
+
+        # Page ids only grow, so postings stay sorted; only the vocab needs
+        # re-sorting. This thread is the only writer, so sort outside the lock.
+        vocab = sorted(self._postings)
+        with self._lock:
+            self._vocab = vocab
+
+    def search(self, query):
+        """Set of (doc_id, page_num) containing every query term.
+
+        While typing, a last word that is not a whole indexed word matches as
+        a prefix ("447" finds 4471).
+        """
+        terms = self.tokenize(query)
+        if not terms:
+            return set()
+        prefix = terms[-1] if query.rstrip()[-1:].isalnum() else None
+
+        with self._lock:
+            postings = []
+            for i, term in enumerate(terms):
+                if prefix is not None and i == len(terms) - 1 and term not in self._postings:
+                    hits = set()
+                    start = bisect.bisect_left(self._vocab, prefix)
+                    for token in self._vocab[start:]:
+                        if not token.startswith(prefix):
+                            break
+                        hits.update(self._postings[token])
+                    postings.append(hits)
+                else:
+                    postings.append(self._postings.get(term, ()))
+
+            # Start from the rarest term; probe the sorted postings of common
+            # terms by binary search instead of materialising them.
+            postings.sort(key=len)
+            matches = set(postings[0])
+            for posting in postings[1:]:
+                if not matches:
+                    break
+                if isinstance(posting, set):
+                    matches &= posting
+                else:
+                    matches = {pid for pid in matches if self._has(posting, pid)}
+            return {self._pages[pid] for pid in matches}
+
+    @staticmethod
+    def _has(posting, pid):
+        i = bisect.bisect_left(posting, pid)
+        return i < len(posting) and posting[i] == pid
+
+    def page_count(self):
+        with self._lock:
+            return len(self._pages)
+
+
+DUPLICATE_GRID = 48 # Side of the grayscale grid that confirms a dHash match
+DUPLICATE_LEVELS = 16 # Grey levels (0-255) a grid cell may differ by and still match
+DUPLICATE_MAX_CHANGED = 0.005 # Fraction of cells allowed beyond that (noise, re-encoding)
+DUPLICATE_CANDIDATES = 32 # Kept pages, nearest hash first, a page is compared against
+
+
+class DuplicateIndex:
+    """Difference hashes (dHash) of every imported page's thumbnail.
+
+    Hashes are 64-bit integers in one NumPy array, so near-duplicate search
+    is a vectorised XOR + popcount over unique hashes rather than a Python
+    loop over page pairs. A 64-bit hash only says two pages look alike
+    (same header and layout is enough), so each candidate pair is then
+    confirmed on a finer grid of the thumbnails.
+    """
+    _POPCOUNT8 = None # Byte popcount table, built on first use (NumPy < 2.0)
+
+    def __init__(self):
+        self._keys = [] # Row -> (doc_id, page_num)
+        self._hashes = None # uint64 array, created with the first document
+
+    @staticmethod
+    def reduce_pixmap(pix):
+        """Average a thumbnail pixmap down to the 8x9 grayscale grid dHash compares."""
+        arr = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+        arr = arr[:, :pix.width * pix.n].reshape(pix.height, pix.width, pix.n)
+        gray = arr[:, :, :3].mean(axis=2) if pix.n >= 3 else arr[:, :, 0].astype(np.float32)
+        # Very small pages: repeat pixels so every grid cell has at least one
+        if gray.shape[0] < 8 or gray.shape[1] < 9:
+            gray = np.repeat(np.repeat(gray, 9, axis=0), 9, axis=1)
+        rows = np.linspace(0, gray.shape[0], 9).astype(int)[:-1]
+        cols = np.linspace(0, gray.shape[1], 10).astype(int)[:-1]
+        sums = np.add.reduceat(np.add.reduceat(gray, rows, axis=0), cols, axis=1)
+        counts = np.outer(np.diff(np.append(rows, gray.shape[0])), np.diff(np.append(cols, gray.shape[1])))
+        return (sums / counts).astype(np.float32)
+
+    @staticmethod
+    def hash_grids(grids):
+        """Batch dHash: (n, 8, 9) grids -> (n,) uint64 hashes."""
+        grids = np.asarray(grids, dtype=np.float32).reshape(-1, 8, 9)
+        bits = grids[:, :, 1:] > grids[:, :, :-1]
+        return np.packbits(bits.reshape(-1, 64), axis=1).view(">u8").ravel().astype(np.uint64)
+
+    def add(self, doc_id, page_nums, hashes):
+        self._keys.extend((doc_id, n) for n in page_nums)
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        self._hashes = hashes if self._hashes is None else np.concatenate([self._hashes, hashes])
+
+    def __len__(self):
+        return len(self._keys)
+
+    @classmethod
+    def _popcount(cls, arr):
+        if hasattr(np, "bitwise_count"): # NumPy >= 2.0
+            return np.bitwise_count(arr)
+        if cls._POPCOUNT8 is None:
+            cls._POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+        return cls._POPCOUNT8[arr.view(np.uint8)].reshape(arr.shape + (8,)).sum(axis=-1)
+
+    @staticmethod
+    def detail_grid(image):
+        """QImage thumbnail -> DUPLICATE_GRID square grayscale array (drafts and sharp images alike)."""
+        img = image.convertToFormat(QImage.Format_Grayscale8).scaled(
+            DUPLICATE_GRID, DUPLICATE_GRID, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+        arr = np.frombuffer(img.constBits(), dtype=np.uint8).reshape(DUPLICATE_GRID, img.bytesPerLine())
+        return arr[:, :DUPLICATE_GRID].astype(np.int16)
+
+    @staticmethod
+    def same_detail(grids, grid):
+        """Whether each of the (n, G, G) grids matches grid -> (n,) bools."""
+        changed = np.count_nonzero(np.abs(grids - grid) > DUPLICATE_LEVELS, axis=(1, 2))
+        return changed <= DUPLICATE_MAX_CHANGED * grid.size
+
+    def groups(self, detail, max_distance=10, block=512):
+        """Lists of (doc_id, page_num) that duplicate the first page of their
+        list; only groups of two or more, in import order.
+
+        Pages whose hashes differ by at most max_distance bits are candidates;
+        detail(key) returns a page's detail_grid (or None if unknown), and
+        same_detail confirms up to DUPLICATE_CANDIDATES of them, nearest hash
+        first, against the first page of their group. Matches are not
+        chained: a page joins a group only if it matches the page that
+        would be kept.
+        """
+        if len(self._keys) < 2:
+            return []
+        uniq, inverse = np.unique(self._hashes, return_inverse=True)
+        inverse = inverse.ravel()
+
+        # Nearest unique hashes of each unique hash, itself included: [(hash, distance)]
+        k = min(DUPLICATE_CANDIDATES, len(uniq))
+        near = []
+        for start in range(0, len(uniq), block):
+            dist = self._popcount(uniq[start:start + block, None] ^ uniq[None, :]).astype(np.int16)
+            nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+            for cols, row in zip(nearest.tolist(), dist):
+                near.append([(v, int(row[v])) for v in cols if row[v] <= max_distance])
+
+        details = {}
+        def grid(key):
+            if key not in details:
+                details[key] = detail(key)
+            return details[key]
+
+        leaders = {} # Key: unique hash, Value: [group index of each kept page with that hash]
+        groups = []
+        for row, u in enumerate(inverse.tolist()):
+            key = self._keys[row]
+            mine = grid(key)
+            target = None
+            if mine is not None:
+                # Nearest hashes first; among equals the earliest group, so pages keep import order
+                candidates = sorted((d, g) for v, d in near[u] for g in leaders.get(v, ())[:DUPLICATE_CANDIDATES])
+                candidates = [g for _, g in candidates[:DUPLICATE_CANDIDATES] if grid(groups[g][0]) is not None]
+                if candidates:
+                    firsts = np.stack([grid(groups[g][0]) for g in candidates])
+                    matches = np.nonzero(self.same_detail(firsts, mine))[0]
+                    if len(matches):
+                        target = candidates[matches[0]]
+            if target is None:
+                leaders.setdefault(u, []).append(len(groups))
+                groups.append([key])
+            else:
+                groups[target].append(key)
+        return [g for g in groups if len(g) > 1]
+
+
+class TextIndexWorker(QThread):
+    """Extracts page text of newly loaded documents and feeds the TextIndex."""
+    docIndexed = Signal(int, int) # doc_id, page count
+
+    def __init__(self, index, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self._queue = queue.Queue()
+
+    def add_source(self, doc_id, filetype, data):
+        self._queue.put((doc_id, filetype, data))
+
+    def stop(self):
+        self._queue.put(None)
+        self.wait()
+
+    def run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            doc_id, filetype, data = job
+            try:
+                # Private handle: the GUI thread keeps using its own document
+                doc = fitz.open(filetype, data)
+                texts = [page.get_text("text") for page in doc]
+                doc.close()
+                self.index.add_document(doc_id, texts)
+                self.docIndexed.emit(doc_id, len(texts))
+            except Exception as e:
+                print(f"Text Index Error: {e}")
+
+
+IMPORT_WORKERS = 4 # Files read and hashed at once; they are opened on one thread
+IMPORT_MAX_BYTES = 512 * 1024 * 1024 # File data read but not yet taken by the editor
+
+
+class ImportPipeline(QObject):
+    """Runs job(path, *args) for dropped files on a bounded thread pool, then
+    parse(result, *args), if given, on one dedicated thread.
+
+    job must not call fitz: PyMuPDF does not support use from several
+    threads at once, so opening and rendering belong in parse. Threads only
+    overlap file reads and hashing, which release the GIL; the parse thread
+    keeps the rest off the GUI thread.
+
+    Before it is read, a file reserves its size against max_bytes. It gives
+    the reservation back once deliver(result) has taken it, so at most
+    max_bytes of file data are in flight (a larger file runs alone).
+    Reservations are granted in drop order, so the next file to deliver is
+    never starved. Results reach deliver in drop order as soon as a file and
+    every file dropped before it are done. Each submit() is a batch, and
+    batchFinished reports its failures together.
+    """
+    batchProgress = Signal(int, int) # Files delivered, files in the batch
+    batchFinished = Signal(int, list) # Files in the batch, [(path, error message)]
+    _jobDone = Signal(int, object) # Ticket, (reserved bytes, result or Exception)
+
+    def __init__(self, job, deliver, parse=None, max_workers=IMPORT_WORKERS, max_bytes=IMPORT_MAX_BYTES,
+                 parent=None):
+        super().__init__(parent)
+        self.job = job
+        self.deliver = deliver
+        self.parse = parse
+        self.max_workers = max_workers
+        self.max_bytes = max_bytes
+        self._pool = None
+        self._parser = None
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._closed = False
+        self._next_ticket = 0
+        self._next_reserve = 0
+        self._next_deliver = 0
+        self._tickets = {} # Key: ticket, Value: (path, batch)
+        self._results = {} # Key: ticket, Value: (reserved bytes, result), waiting for earlier files
+        self._batches = {} # Key: batch, Value: [files delivered, files, failures]
+        self._next_batch = 0
+        self._jobDone.connect(self._on_job_done) # Queued: emitted from pool threads
+
+    def submit(self, paths, *args):
+        """Queues a batch; args are passed on to job and parse after the path or result."""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="import")
+            self._parser = ThreadPoolExecutor(max_workers=1, thread_name_prefix="import-parse")
+        batch = self._next_batch
+        self._next_batch += 1
+        self._batches[batch] = [0, len(paths), []]
+        for path in paths:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._tickets[ticket] = (path, batch)
+            self._pool.submit(self._run, ticket, path, args)
+        return batch
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._pool:
+            # Do not hold up closing the window; a file being parsed finishes unseen
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._parser.shutdown(wait=False, cancel_futures=True)
+            self._pool = self._parser = None
+
+    def _run(self, ticket, path, args):
+        try:
+            size = min(os.path.getsize(path), self.max_bytes)
+        except OSError:
+            size = 0 # job() reports the error
+        with self._cond:
+            while not self._closed and (self._next_reserve != ticket or
+                                        (self._in_flight and self._in_flight + size > self.max_bytes)):
+                self._cond.wait()
+            if self._closed:
+                return
+            self._in_flight += size
+            self._next_reserve += 1
+            self._cond.notify_all()
+        try:
+            result = self.job(path, *args)
+        except Exception as e:
+            result = e
+        if self.parse is not None and not isinstance(result, Exception):
+            try:
+                self._parser.submit(self._parse, ticket, size, result, args)
+            except (AttributeError, RuntimeError):
+                pass # Shut down meanwhile
+            return
+        if not self._closed:
+            self._jobDone.emit(ticket, (size, result))
+
+    def _parse(self, ticket, size, result, args):
+        try:
+            result = self.parse(result, *args)
+        except Exception as e:
+            result = e
+        if not self._closed:
+            self._jobDone.emit(ticket, (size, result))
+
+    def _on_job_done(self, ticket, outcome):
+        self._results[ticket] = outcome
+        while self._next_deliver in self._results:
+            ticket = self._next_deliver
+            self._next_deliver += 1
+            size, result = self._results.pop(ticket)
+            path, batch = self._tickets.pop(ticket)
+            if isinstance(result, Exception):
+                self._batches[batch][2].append((path, str(result)))
+            else:
+                try:
+                    self.deliver(result)
+                except Exception as e:
+                    self._batches[batch][2].append((path, str(e)))
+            with self._cond:
+                self._in_flight -= size
+                self._cond.notify_all()
+            state = self._batches[batch]
+            state[0] += 1
+            self.batchProgress.emit(state[0], state[1])
+            if state[0] == state[1]:
+                del self._batches[batch]
+                self.batchFinished.emit(state[1], state[2])
+
+
+EXPORT_PRIORITIES = ["高 (High)", "一般 (Normal)", "低 (Low)"] # Index is the queue priority
+SPLIT_RULES = [(None, "不分割 (None)"), ('pages', "每 N 頁 (Every N pages)"),
+               ('source', "依來源檔 (By source file)"), ('size', "依大小 MB (By size)")]
+
+PAGE_MIME_TYPE = "application/x-pdf-assembler-pages"
+
+# Item data roles of page items, computed once (Qt.UserRole + n costs an enum
+# operation on every call, which dominated loops over large lists)
+ROLE_PAGE = Qt.UserRole # Page index in the source document
+ROLE_ROTATION = Qt.UserRole + 1 # Extra rotation in degrees
+ROLE_DOC = Qt.UserRole + 2 # doc_id of the source
+
+
+def rows_selection(model, rows):
+    """QItemSelection of sorted rows, as contiguous ranges rather than item by item."""
+    selection = QItemSelection()
+    if not rows:
+        return selection
+    start = prev = rows[0]
+    for row in rows[1:] + [None]:
+        if row is not None and row == prev + 1:
+            prev = row
+            continue
+        selection.select(model.index(start, 0), model.index(prev, 0))
+        if row is not None:
+            start = prev = row
+    return selection
+
 
 class PDFPageList(QListWidget):
-    """Custom ListWidget to handle Drag & Drop of PDF Pages"""
+    """Custom ListWidget to handle Drag & Drop of PDF Pages
+
+    Page drags carry only compact (doc_id, page_num, rotation, name) records
+    under PAGE_MIME_TYPE instead of Qt's default item serialization (icons and
+    all roles). The receiving list emits pagesDropped and the editor rebuilds
+    the items in one batch from cached icons.
+    """
     filesDropped = Signal(list) # Emitted when actual files are dropped
     aboutToChange = Signal()
+    pagesDropped = Signal(list, int, object) # Records, target row, source list (or None)
+    viewportChanged = Signal() # Scrolled or resized
     # contextMenuRequested = Signal(object) # Removed redundant signal
 
     def __init__(self, parent=None):
@@ -325,6 +2644,7 @@ class PDFPageList(QListWidget):
         self.setIconSize(QSize(120, 160))
         self.setSpacing(10)
         self.setResizeMode(QListWidget.Adjust)
+        self.verticalScrollBar().valueChanged.connect(self.viewportChanged)
         
         # Drag & Drop Support
         self.setDragEnabled(True)
@@ -334,10 +2654,87 @@ class PDFPageList(QListWidget):
         self.setSelectionMode(QListWidget.ExtendedSelection)
         self.setDefaultDropAction(Qt.MoveAction)
         
+        self._moved_internally = False
+
         # Context Menu
         self.setContextMenuPolicy(Qt.CustomContextMenu)
         # self.customContextMenuRequested.connect(self.contextMenuRequested) # Removed redundant connection
 
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.viewportChanged.emit()
+
+    def visible_rows(self):
+        """Rows currently on screen (icon mode lays rows out top to bottom)."""
+        count = self.count()
+        height = self.viewport().height()
+        if not count or not self.isVisible():
+            return range(0)
+        # First row whose rect reaches into the viewport
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._row_rect(mid).bottom() < 0:
+                lo = mid + 1
+            else:
+                hi = mid
+        end = lo
+        while end < count and self._row_rect(end).top() < height:
+            end += 1
+        return range(lo, end)
+
+    def _row_rect(self, row):
+        return self.visualRect(self.model().index(row, 0))
+
+    def mimeTypes(self):
+        return [PAGE_MIME_TYPE] + super().mimeTypes()
+
+    def mimeData(self, items):
+        records = [[item.data(ROLE_DOC), item.data(ROLE_PAGE),
+                    item.data(ROLE_ROTATION) or 0, item.text()] for item in items]
+        mime = QMimeData()
+        mime.setData(PAGE_MIME_TYPE, json.dumps(records, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        return mime
+
+    @staticmethod
+    def decode_records(mime):
+        records = json.loads(bytes(mime.data(PAGE_MIME_TYPE)).decode("utf-8"))
+        return [{'doc_id': d, 'page_num': p, 'rotation': r, 'text': t} for d, p, r, t in records]
+
+    def startDrag(self, supportedActions):
+        # Rows in visual order, not selection order
+        rows = sorted({idx.row() for idx in self.selectionModel().selectedIndexes()})
+        if not rows:
+            return
+        items = [self.item(row) for row in rows]
+        drag = QDrag(self)
+        drag.setMimeData(self.mimeData(items))
+        icon = items[0].icon()
+        if not icon.isNull():
+            drag.setPixmap(icon.pixmap(self.iconSize() / 2))
+
+        self._moved_internally = False
+        if drag.exec(supportedActions, self.defaultDropAction()) == Qt.MoveAction and not self._moved_internally:
+            # Moved to another list: remove the originals in one pass
+            self.aboutToChange.emit()
+            self.setUpdatesEnabled(False)
+            self.selectionModel().clear()
+            for row in reversed(rows):
+                self.takeItem(row)
+            self.setUpdatesEnabled(True)
+
+    def drop_row(self, event):
+        """Row the dropped pages should be inserted at."""
+        index = self.indexAt(event.position().toPoint())
+        if not index.isValid():
+            return self.count()
+        indicator = self.dropIndicatorPosition()
+        if indicator == QAbstractItemView.BelowItem:
+            return index.row() + 1
+        if indicator == QAbstractItemView.OnItem and event.position().x() > self.visualRect(index).center().x():
+            return index.row() + 1
+        return index.row()
+
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls():
             event.accept()
@@ -358,12 +2755,334 @@ class PDFPageList(QListWidget):
             paths = [u.toLocalFile() for u in urls if u.toLocalFile().lower().endswith('.pdf')]
             if paths:
                 self.filesDropped.emit(paths)
+        elif event.mimeData().hasFormat(PAGE_MIME_TYPE):
+            records = self.decode_records(event.mimeData())
+            source = event.source() if isinstance(event.source(), PDFPageList) else None
+            row = self.drop_row(event)
+            event.accept()
+            if source is self:
+                # Internal move: tell our startDrag not to remove anything afterwards
+                self._moved_internally = True
+                event.setDropAction(Qt.CopyAction)
+            self.pagesDropped.emit(records, row, source)
         else:
             # Handle Internal/Cross-List Drop
             self.aboutToChange.emit()
             super().dropEvent(event)
 
 
+PREVIEW_TILE_SIZE = 256 # Tile edge in device pixels
+PREVIEW_ZOOM_LEVELS = [0.25, 0.5, 1, 2, 4, 8, 16] # Pixels per point, one tile set each
+
+
+class TileCache:
+    """Bounded LRU cache of rendered preview tiles across all zoom levels."""
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self._tiles = OrderedDict() # Key: (doc_id, page_num, level, tx, ty), Value: QImage
+        self._bytes = 0
+        self.max_bytes = max_bytes
+
+    def get(self, key):
+        img = self._tiles.get(key)
+        if img is not None:
+            self._tiles.move_to_end(key)
+        return img
+
+    def put(self, key, img):
+        old = self._tiles.pop(key, None)
+        if old is not None:
+            self._bytes -= old.sizeInBytes()
+        self._tiles[key] = img
+        self._bytes += img.sizeInBytes()
+        while self._bytes > self.max_bytes and len(self._tiles) > 1:
+            _, dropped = self._tiles.popitem(last=False)
+            self._bytes -= dropped.sizeInBytes()
+
+    def __contains__(self, key):
+        return key in self._tiles
+
+    def usage(self):
+        """(tile count, bytes) currently held."""
+        return len(self._tiles), self._bytes
+
+    def clear(self):
+        self._tiles.clear()
+        self._bytes = 0
+
+
+class TileRenderer(QThread):
+    """Renders preview tiles in the background from its own document handles.
+
+    Requests replace each other, so only tiles the view still wants get rendered.
+    """
+    tileReady = Signal(object, QImage) # Key, Image
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cond = threading.Condition()
+        self._pending = [] # Tile keys, highest priority first
+        self._current = None # Key being rendered right now
+        self._sources = {} # Key: doc_id, Value: (filetype, bytes)
+        self._docs = {} # Key: doc_id, Value: fitz.Document (worker thread only)
+        self._display_lists = OrderedDict() # Key: (doc_id, page_num), Value: fitz.DisplayList
+        self._running = True
+
+    def add_source(self, doc_id, filetype, data):
+        with self._cond:
+            self._sources[doc_id] = (filetype, data)
+
+    def request(self, keys):
+        """Replace the pending queue with the tiles the view wants now."""
+        with self._cond:
+            self._pending = [k for k in keys if k != self._current]
+            self._cond.notify()
+
+    def open_doc_ids(self):
+        """Ids of the documents this worker holds open (a copy, safe from any thread)."""
+        return list(self._docs)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                key = self._pending.pop(0)
+                self._current = key
+            try:
+                img = self._render(key)
+            except Exception as e:
+                print(f"Preview Error: {e}")
+                img = None
+            with self._cond:
+                self._current = None
+            if img is not None:
+                self.tileReady.emit(key, img)
+
+    def _doc(self, doc_id):
+        doc = self._docs.get(doc_id)
+        if doc is None:
+            with self._cond:
+                source = self._sources.get(doc_id)
+            if source is None:
+                return None
+            doc = fitz.open(source[0], source[1])
+            self._docs[doc_id] = doc
+        return doc
+
+    def _display_list(self, doc_id, page_num):
+        dl_key = (doc_id, page_num)
+        dl = self._display_lists.get(dl_key)
+        if dl is None:
+            doc = self._doc(doc_id)
+            if doc is None:
+                return None
+            # Parse the page once; every tile and zoom level replays the list
+            dl = doc.load_page(page_num).get_displaylist(annots=True)
+            self._display_lists[dl_key] = dl
+            if len(self._display_lists) > 4:
+                self._display_lists.popitem(last=False)
+        else:
+            self._display_lists.move_to_end(dl_key)
+        return dl
+
+    def _render(self, key):
+        doc_id, page_num, level, tx, ty = key
+        dl = self._display_list(doc_id, page_num)
+        if dl is None:
+            return None
+        zoom = PREVIEW_ZOOM_LEVELS[level]
+        step = PREVIEW_TILE_SIZE / zoom
+        clip = fitz.Rect(tx * step, ty * step, (tx + 1) * step, (ty + 1) * step) & dl.rect
+        if clip.is_empty:
+            return None
+        pix = dl.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, alpha=False)
+        return QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888).copy()
+
+
+class ThumbnailRefiner(TileRenderer):
+    """Re-renders draft thumbnails sharply (annotations, device pixel ratio).
+
+    Keys are (doc_id, page_num, scale); the editor requests only the pages
+    visible once scrolling settles.
+    """
+    def _render(self, key):
+        doc_id, page_num, scale = key
+        doc = self._doc(doc_id)
+        if doc is None:
+            return None
+        pix = render_thumbnail(doc.load_page(page_num), scale, draft=False)
+        img = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888).copy()
+        img.setDevicePixelRatio(scale)
+        return img
+
+
+class PagePreview(QWidget):
+    """Zoomable, pannable view of a single page.
+
+    The upscaled thumbnail is painted at once; sharper tiles for the current
+    zoom level replace it as the TileRenderer delivers them. Wheel zooms
+    around the cursor, drag pans, double-click fits the page.
+    """
+    def __init__(self, renderer, parent=None):
+        super().__init__(parent)
+        self.renderer = renderer
+        self.renderer.tileReady.connect(self._on_tile_ready)
+        self.cache = TileCache()
+
+        self.page_key = None # (doc_id, page_num)
+        self.page_size = (0, 0) # Page rect in points, before item rotation
+        self.rotation = 0
+        self.base_img = None
+        self.zoom = 1.0 # Screen pixels per point
+        self.offset = QPointF(0, 0) # Screen position of the page's top-left
+        self._fit = True
+        self._drag_pos = None
+
+        self.setMinimumWidth(250)
+
+    def set_page(self, doc_id, page_num, rotation, page_size, base_img):
+        self.page_key = (doc_id, page_num)
+        self.rotation = rotation % 360
+        self.page_size = page_size
+        self.base_img = base_img
+        self.fit_page()
+
+    def clear_page(self):
+        self.page_key = None
+        self.base_img = None
+        self.renderer.request([])
+        self.update()
+
+    def _rotated_size(self):
+        w, h = self.page_size
+        return (h, w) if self.rotation in (90, 270) else (w, h)
+
+    def fit_page(self):
+        self._fit = True
+        rw, rh = self._rotated_size()
+        if rw <= 0 or rh <= 0:
+            return
+        self.zoom = min(self.width() / rw, self.height() / rh) * 0.95
+        self.offset = QPointF((self.width() - rw * self.zoom) / 2, (self.height() - rh * self.zoom) / 2)
+        self.update()
+
+    def _page_transform(self):
+        """Maps page points to widget pixels (rotation, zoom, pan)."""
+        w, h = self.page_size
+        tr = QTransform()
+        tr.translate(self.offset.x(), self.offset.y())
+        tr.scale(self.zoom, self.zoom)
+        if self.rotation == 90:
+            tr.translate(h, 0)
+        elif self.rotation == 180:
+            tr.translate(w, h)
+        elif self.rotation == 270:
+            tr.translate(0, w)
+        tr.rotate(self.rotation)
+        return tr
+
+    def _level(self):
+        needed = self.zoom * self.devicePixelRatioF()
+        for i, z in enumerate(PREVIEW_ZOOM_LEVELS):
+            if z >= needed:
+                return i
+        return len(PREVIEW_ZOOM_LEVELS) - 1
+
+    def _visible_tiles(self, level, visible):
+        step = PREVIEW_TILE_SIZE / PREVIEW_ZOOM_LEVELS[level]
+        tx0, ty0 = int(visible.left() // step), int(visible.top() // step)
+        tx1, ty1 = int(visible.right() // step), int(visible.bottom() // step)
+        return [(tx, ty) for ty in range(ty0, ty1 + 1) for tx in range(tx0, tx1 + 1)], step
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#1e1e1e"))
+        if not self.page_key:
+            painter.end()
+            return
+
+        doc_id, page_num = self.page_key
+        w, h = self.page_size
+        page_rect = QRectF(0, 0, w, h)
+        tr = self._page_transform()
+        visible = tr.inverted()[0].mapRect(QRectF(self.rect())).intersected(page_rect)
+
+        painter.setTransform(tr)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        painter.fillRect(page_rect, Qt.white)
+        if self.base_img is not None:
+            painter.drawImage(page_rect, self.base_img)
+
+        level = self._level()
+        wanted = []
+        if not visible.isEmpty():
+            # Coarser cached levels first, so the best available detail ends on top
+            for lvl in range(level + 1):
+                tiles, step = self._visible_tiles(lvl, visible)
+                for tx, ty in tiles:
+                    key = (doc_id, page_num, lvl, tx, ty)
+                    img = self.cache.get(key)
+                    if img is not None:
+                        target = QRectF(tx * step, ty * step, img.width() * step / PREVIEW_TILE_SIZE,
+                                        img.height() * step / PREVIEW_TILE_SIZE)
+                        painter.drawImage(target, img)
+                    elif lvl == level:
+                        wanted.append(key)
+        painter.end()
+
+        # Render the tiles nearest the centre of the view first
+        centre = visible.center()
+        step = PREVIEW_TILE_SIZE / PREVIEW_ZOOM_LEVELS[level]
+        wanted.sort(key=lambda k: abs((k[3] + 0.5) * step - centre.x()) + abs((k[4] + 0.5) * step - centre.y()))
+        self.renderer.request(wanted)
+
+    def _on_tile_ready(self, key, img):
+        self.cache.put(key, img)
+        if self.page_key == key[:2]:
+            self.update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self._fit:
+            self.fit_page()
+
+    def wheelEvent(self, event):
+        if not self.page_key:
+            return
+        factor = 1.25 ** (event.angleDelta().y() / 120)
+        new_zoom = max(0.05, min(self.zoom * factor, PREVIEW_ZOOM_LEVELS[-1]))
+        pos = event.position()
+        self.offset = pos - (pos - self.offset) * (new_zoom / self.zoom)
+        self.zoom = new_zoom
+        self._fit = False
+        self.update()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._drag_pos = event.position()
+
+    def mouseMoveEvent(self, event):
+        if self._drag_pos is not None:
+            self.offset += event.position() - self._drag_pos
+            self._drag_pos = event.position()
+            self._fit = False
+            self.update()
+
+    def mouseReleaseEvent(self, event):
+        self._drag_pos = None
+
+    def mouseDoubleClickEvent(self, event):
+        self.fit_page()
+
+
 class PDFEditor(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -371,13 +3090,84 @@ class PDFEditor(QMainWindow):
         self.resize(1300, 900)
         
         # Data Registry
-        # source_docs: List of { 'doc': fitz.Document, 'path': str, 'id': int }
+        # source_docs: List of { 'doc': fitz.Document, 'path': str, 'id': int,
+        #                         'bytes': bytes, 'filetype': str,
+        #                         'stat': (size, mtime_ns) of the file when loaded, or None if converted,
+        #                         'digest': sha1 of the file as read, shared by identical imports }
         self.source_docs = [] 
         self.doc_counter = 0
 
         # State & Cache
         self.thumbnail_cache = ThumbnailCache()
         self.history = HistoryManager()
+
+        # Background tile renderer for the preview pane (started in finish_setup)
+        self.tile_renderer = TileRenderer(self)
+        # Sharp thumbnails for the items on screen, replacing the import drafts
+        self.thumb_refiner = ThumbnailRefiner(self)
+        self.thumb_refiner.tileReady.connect(self._on_thumbnail_refined)
+        self.refine_timer = QTimer(self)
+        self.refine_timer.setSingleShot(True)
+        self.refine_timer.setInterval(150)
+        self.refine_timer.timeout.connect(self.refine_visible_thumbnails)
+
+        # Full-text index, filled in the background as documents load
+        self.text_index = TextIndex()
+        self.text_indexer = TextIndexWorker(self.text_index, self)
+        self.text_indexer.docIndexed.connect(self._on_doc_indexed)
+        self.search_hits = set()
+        self._search_query = "" # Query whose hits were last selected
+
+        # Rotated icons being built in the background
+        self.rotation_workers = []
+        self._pending_icons = {} # Key: (doc_id, page_num, rotation), Value: [items waiting]
+        self._placeholder_icons = {} # Key: landscape (bool), Value: QIcon
+
+        # Perceptual hashes of every imported page
+        self.duplicate_index = DuplicateIndex()
+        # Per-page object sizes for size-based splitting and the export estimate
+        self.size_estimator = PageSizeEstimator()
+        self.throughput = ThroughputStats()
+        self._estimate_run = None
+        self.estimate_timer = QTimer(self)
+        self.estimate_timer.setSingleShot(True)
+        self.estimate_timer.setInterval(300)
+        self.estimate_timer.timeout.connect(self.start_estimate)
+        self.estimate_step_timer = QTimer(self)
+        self.estimate_step_timer.timeout.connect(self._estimate_step)
+
+        # Diagnostics: memory held per document, refreshed while the panel is shown
+        self.usage = {}
+        self._usage_run = None
+        self.usage_timer = QTimer(self)
+        self.usage_timer.setInterval(2000)
+        self.usage_timer.timeout.connect(self.start_usage_scan)
+        self.usage_step_timer = QTimer(self)
+        self.usage_step_timer.timeout.connect(self._usage_step)
+
+        # Crash-recovery journal of main-list edits (started in finish_setup)
+        self.journal = SessionJournal()
+        self.journal_active = False
+        self._journal_paused = False # Set while a rebuild journals its net change itself
+        self._journal_pending = []
+        self.journal_timer = QTimer(self)
+        self.journal_timer.setSingleShot(True)
+        self.journal_timer.setInterval(100)
+        self.journal_timer.timeout.connect(self.flush_journal)
+
+        # Exports run in worker processes; rows of the job panel by job id
+        self.export_queue = ExportQueue(parent=self)
+        self.export_queue.jobStarted.connect(self.on_save_started)
+        self.export_queue.jobProgress.connect(self.on_save_progress)
+        self.export_queue.jobFinished.connect(self.on_save_finished)
+        self.export_queue.jobVerifying.connect(self.on_save_verifying)
+        self.job_rows = {}
+
+        # Dropped files are read and parsed in the background
+        self.import_pipeline = ImportPipeline(self._read_import, self._register_source, self._parse_import,
+                                              parent=self)
+        self.import_pipeline.batchProgress.connect(self.on_import_progress)
+        self.import_pipeline.batchFinished.connect(self.on_import_finished)
         # self.clipboard_pages = [] # Removed clipboard, using direct duplicate
 
         # Keyboard Shortcuts
@@ -404,10 +3194,56 @@ class PDFEditor(QMainWindow):
         self.del_action.triggered.connect(self.delete_pages)
         self.addAction(self.del_action)
 
-        # Setup UI
+        # Setup UI (sidebar tools and background services follow in finish_setup)
+        self.setup_done = False
         self.setup_ui()
         self.apply_styles()
-        
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.setup_done:
+            # Let the first frame paint before building the rest
+            QTimer.singleShot(0, self.finish_setup)
+
+    def finish_setup(self):
+        """Builds the sidebar tools and starts background services after the window is shown."""
+        if self.setup_done:
+            return
+        self.setup_done = True
+        STARTUP.mark("first paint")
+        self.fill_sidebar(self.sidebar.layout())
+        STARTUP.mark("sidebar")
+        self.tile_renderer.start()
+        self.thumb_refiner.start()
+        self.text_indexer.start()
+        # Build / refresh the font index off the GUI thread so the first export does not scan
+        threading.Thread(target=FontIndex.shared, daemon=True).start()
+        STARTUP.mark("background services")
+        STARTUP.report(verbose="--startup-report" in sys.argv)
+        # Offer recovery once the window is up
+        QTimer.singleShot(0, self.start_journal)
+
+    def closeEvent(self, event):
+        if self.export_queue.running_count():
+            reply = QMessageBox.question(self, "匯出中 (Exporting)",
+                                         "仍有匯出工作進行中，確定要取消並關閉嗎?\n(Cancel running exports and quit?)")
+            if reply != QMessageBox.Yes:
+                event.ignore()
+                return
+        self.export_queue.shutdown()
+        self.import_pipeline.shutdown()
+        if self.journal_active:
+            self.flush_journal()
+            self.journal_active = False
+        self.journal.close()
+        self.tile_renderer.stop()
+        self.thumb_refiner.stop()
+        self.text_indexer.stop()
+        for worker in list(self.rotation_workers):
+            worker.running = False
+            worker.wait()
+        super().closeEvent(event)
+
     def apply_styles(self):
         self.setStyleSheet(DARK_THEME_QSS)
 
@@ -418,9 +3254,9 @@ class PDFEditor(QMainWindow):
         main_layout.setContentsMargins(0, 0, 0, 0)
         main_layout.setSpacing(0)
 
-        # --- Sidebar ---
-        sidebar = self.create_sidebar()
-        main_layout.addWidget(sidebar)
+        # --- Sidebar (tools are added by finish_setup) ---
+        self.sidebar = self.create_sidebar()
+        main_layout.addWidget(self.sidebar)
 
         # --- Right Content (Splitter) ---
         right_panel = QWidget()
@@ -443,6 +3279,7 @@ class PDFEditor(QMainWindow):
         self.main_list = PDFPageList()
         # Connect internal move signal handled by default, but we might want status
         self.main_list.aboutToChange.connect(self.capture_state)
+        self.main_list.pagesDropped.connect(lambda records, row, source: self.drop_pages(self.main_list, records, row, source))
         # Context Menu
         self.main_list.customContextMenuRequested.connect(self.show_context_menu)
         # DISABLE Drag Reordering in Main List (DropOnly allows drops from outside/Staging, but not Dragging items internally)
@@ -463,6 +3300,7 @@ class PDFEditor(QMainWindow):
         self.staging_list = PDFPageList()
         # Handle file drops on both, but typically staging is for drops
         self.staging_list.filesDropped.connect(self.load_pdfs_to_staging)
+        self.staging_list.pagesDropped.connect(lambda records, row, source: self.drop_pages(self.staging_list, records, row, source))
         # Enable Drag from Staging (Default is DragDrop, which is fine, or DragOnly)
         self.staging_list.customContextMenuRequested.connect(self.show_context_menu)
         
@@ -475,13 +3313,83 @@ class PDFEditor(QMainWindow):
         self.splitter.setStretchFactor(0, 2)
         self.splitter.setStretchFactor(1, 1)
 
-        right_layout.addWidget(self.splitter)
+        # 3. Preview Pane (right of the lists)
+        self.preview_area_widget = QWidget()
+        vbox_preview = QVBoxLayout(self.preview_area_widget)
+        vbox_preview.setContentsMargins(0,0,0,0)
+
+        lbl_preview = QLabel("預覽 (Preview) - 滾輪縮放，拖曳平移，雙擊符合頁面")
+        lbl_preview.setObjectName("SectionHeader")
+        vbox_preview.addWidget(lbl_preview)
+
+        self.preview = PagePreview(self.tile_renderer)
+        vbox_preview.addWidget(self.preview)
+
+        self.main_list.currentItemChanged.connect(lambda item, _: self.show_preview(item))
+        for page_list in (self.main_list, self.staging_list):
+            page_list.viewportChanged.connect(self.refine_timer.start)
+            page_list.model().rowsInserted.connect(self.refine_timer.start)
+        self.staging_list.currentItemChanged.connect(lambda item, _: self.show_preview(item))
+
+        self.content_splitter = QSplitter(Qt.Horizontal)
+        self.content_splitter.addWidget(self.splitter)
+        self.content_splitter.addWidget(self.preview_area_widget)
+        self.content_splitter.setStretchFactor(0, 2)
+        self.content_splitter.setStretchFactor(1, 1)
+
+        right_layout.addWidget(self.content_splitter)
         
-        # Progress Bar (Hidden by default)
-        self.progress_bar = QProgressBar()
-        self.progress_bar.setVisible(False)
-        self.progress_bar.setStyleSheet("QProgressBar { border: 1px solid #3e3e42; border-radius: 5px; text-align: center; } QProgressBar::chunk { background-color: #007acc; }")
-        right_layout.addWidget(self.progress_bar)
+        # Export Queue (Hidden until the first export)
+        self.jobs_widget = QWidget()
+        vbox_jobs = QVBoxLayout(self.jobs_widget)
+        vbox_jobs.setContentsMargins(0, 0, 0, 0)
+        hbox_jobs = QHBoxLayout()
+        lbl_jobs = QLabel("匯出佇列 (Export Queue)")
+        lbl_jobs.setObjectName("SectionHeader")
+        hbox_jobs.addWidget(lbl_jobs)
+        hbox_jobs.addStretch()
+        btn_clear_jobs = QPushButton("清除已完成 (Clear Finished)")
+        btn_clear_jobs.clicked.connect(self.clear_finished_jobs)
+        hbox_jobs.addWidget(btn_clear_jobs)
+        vbox_jobs.addLayout(hbox_jobs)
+
+        self.jobs_table = QTableWidget(0, 5)
+        self.jobs_table.setHorizontalHeaderLabels(["檔案 (File)", "優先 (Priority)", "狀態 (State)", "進度 (Progress)", ""])
+        self.jobs_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.jobs_table.verticalHeader().setVisible(False)
+        self.jobs_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.jobs_table.setSelectionMode(QAbstractItemView.NoSelection)
+        self.jobs_table.setMaximumHeight(160)
+        vbox_jobs.addWidget(self.jobs_table)
+        self.jobs_widget.setVisible(False)
+        right_layout.addWidget(self.jobs_widget)
+
+        # Resource Usage (Hidden until toggled from the sidebar)
+        self.usage_widget = QWidget()
+        vbox_usage = QVBoxLayout(self.usage_widget)
+        vbox_usage.setContentsMargins(0, 0, 0, 0)
+        hbox_usage = QHBoxLayout()
+        lbl_usage = QLabel("資源使用 (Resource Usage)")
+        lbl_usage.setObjectName("SectionHeader")
+        hbox_usage.addWidget(lbl_usage)
+        hbox_usage.addStretch()
+        btn_usage_dump = QPushButton("匯出 JSON (Save JSON)")
+        btn_usage_dump.clicked.connect(self.save_usage_dump)
+        hbox_usage.addWidget(btn_usage_dump)
+        vbox_usage.addLayout(hbox_usage)
+
+        self.lbl_usage = QLabel("")
+        vbox_usage.addWidget(self.lbl_usage)
+        self.usage_table = QTableWidget(0, len(USAGE_COLUMNS))
+        self.usage_table.setHorizontalHeaderLabels([label for _, label in USAGE_COLUMNS])
+        self.usage_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.usage_table.verticalHeader().setVisible(False)
+        self.usage_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.usage_table.setSelectionMode(QAbstractItemView.NoSelection)
+        self.usage_table.setMaximumHeight(200)
+        vbox_usage.addWidget(self.usage_table)
+        self.usage_widget.setVisible(False)
+        right_layout.addWidget(self.usage_widget)
         
         # Status Bar
         self.status_label = QLabel("就緒 (Ready)")
@@ -497,7 +3405,9 @@ class PDFEditor(QMainWindow):
         layout = QVBoxLayout(sidebar)
         layout.setContentsMargins(15, 20, 15, 20)
         layout.setSpacing(15)
-        
+        return sidebar
+
+    def fill_sidebar(self, layout):
         lbl_tools = QLabel("工具箱 (Tools)")
         lbl_tools.setStyleSheet("font-size: 18px; font-weight: bold; color: #007acc; border: none;")
         layout.addWidget(lbl_tools)
@@ -513,9 +3423,68 @@ class PDFEditor(QMainWindow):
         btn_save.clicked.connect(self.save_pdf)
         btn_save.setStyleSheet("background-color: #2ea043;")
         vbox.addWidget(btn_save)
+
+        hbox_prio = QHBoxLayout()
+        hbox_prio.addWidget(QLabel("匯出優先 (Priority):"))
+        self.combo_priority = QComboBox()
+        self.combo_priority.addItems(EXPORT_PRIORITIES)
+        self.combo_priority.setCurrentIndex(1)
+        hbox_prio.addWidget(self.combo_priority)
+        vbox.addLayout(hbox_prio)
+
+        self.btn_usage = QPushButton("資源使用 (Resources)")
+        self.btn_usage.setCheckable(True)
+        self.btn_usage.toggled.connect(self.toggle_usage_panel)
+        vbox.addWidget(self.btn_usage)
         grp_file.setLayout(vbox)
         layout.addWidget(grp_file)
 
+        # Search Group
+        grp_search = QGroupBox("搜尋 (Search)")
+        vbox_search = QVBoxLayout()
+        vbox_search.setSpacing(8)
+
+        self.txt_search = QLineEdit()
+        self.txt_search.setPlaceholderText("搜尋頁面文字 (e.g. invoice 4471)")
+        self.txt_search.setClearButtonEnabled(True)
+        vbox_search.addWidget(self.txt_search)
+
+        # Debounce typing so each keystroke does not re-scan the lists
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.run_search)
+        self.txt_search.textChanged.connect(self.search_timer.start)
+
+        self.chk_search_filter = QCheckBox("只顯示符合頁面 (Filter)")
+        self.chk_search_filter.toggled.connect(self.run_search)
+        vbox_search.addWidget(self.chk_search_filter)
+
+        btn_add_hits = QPushButton("加入所有結果 (Add Hits)")
+        btn_add_hits.clicked.connect(self.add_search_hits)
+        vbox_search.addWidget(btn_add_hits)
+
+        grp_search.setLayout(vbox_search)
+        layout.addWidget(grp_search)
+
+        # Duplicates Group
+        grp_dup = QGroupBox("重複頁面 (Duplicates)")
+        hbox_dup = QHBoxLayout()
+
+        btn_show_dup = QPushButton("標示 (Show)")
+        btn_show_dup.setToolTip("選取與其他頁面幾乎相同的頁面")
+        btn_show_dup.clicked.connect(lambda: self.duplicates_op(drop=False))
+        hbox_dup.addWidget(btn_show_dup)
+
+        btn_drop_dup = QPushButton("移除 (Drop)")
+        btn_drop_dup.setToolTip("每組重複頁面只保留第一頁")
+        btn_drop_dup.clicked.connect(lambda: self.duplicates_op(drop=True))
+        btn_drop_dup.setStyleSheet("background-color: #d73a49;")
+        hbox_dup.addWidget(btn_drop_dup)
+
+        grp_dup.setLayout(hbox_dup)
+        layout.addWidget(grp_dup)
+
         # Output Settings Group
         grp_out = QGroupBox("輸出設定 (Export Settings)")
         vbox_out = QVBoxLayout()
@@ -586,6 +3555,46 @@ class PDFEditor(QMainWindow):
         hbox_style.addWidget(self.spin_size)
         
         vbox_out.addLayout(hbox_style)
+
+        # Split Export
+        vbox_out.addWidget(QLabel("分割輸出 (Split):"))
+        hbox_split = QHBoxLayout()
+        self.combo_split = QComboBox()
+        self.combo_split.addItems([label for _, label in SPLIT_RULES])
+        hbox_split.addWidget(self.combo_split)
+        self.spin_split = QSpinBox()
+        self.spin_split.setRange(1, 100000)
+        self.spin_split.setValue(100)
+        self.spin_split.setToolTip("每份頁數或大小上限 MB (Pages or MB per part)")
+        hbox_split.addWidget(self.spin_split)
+        vbox_out.addLayout(hbox_split)
+        self.chk_split_numbering = QCheckBox("每份重新編號 (Number each part)")
+        vbox_out.addWidget(self.chk_split_numbering)
+        self.chk_verify = QCheckBox("匯出後驗證 (Verify after export)")
+        self.chk_verify.setToolTip("重新開啟輸出檔，比對頁數、旋轉與每頁內容\n(Re-open the output and compare page count, rotation and page content)")
+        vbox_out.addWidget(self.chk_verify)
+        hbox_impose = QHBoxLayout()
+        hbox_impose.addWidget(QLabel("拼版 (Imposition):"))
+        self.combo_impose = QComboBox()
+        self.combo_impose.addItems([label for _, label in IMPOSE_MODES])
+        hbox_impose.addWidget(self.combo_impose)
+        # Verification compares page for page, which imposed sheets are not
+        self.combo_impose.currentIndexChanged.connect(lambda index: self.chk_verify.setEnabled(index == 0))
+        vbox_out.addLayout(hbox_impose)
+        self.chk_impose_originals = QCheckBox("同時保留原始頁 (Also keep the pages)")
+        self.chk_impose_originals.setToolTip("原始頁之後接拼版頁，共用同一份頁面內容\n(Imposed sheets follow the pages and share their content)")
+        vbox_out.addWidget(self.chk_impose_originals)
+
+        # Pre-flight estimate of the main composition
+        self.lbl_estimate = QLabel("預估 (Estimate): -")
+        self.lbl_estimate.setStyleSheet("color: #aaaaaa; border: none;")
+        vbox_out.addWidget(self.lbl_estimate)
+        self.chk_overlay_enable.toggled.connect(self.schedule_estimate)
+        self.txt_overlay.textChanged.connect(self.schedule_estimate)
+        model = self.main_list.model()
+        model.rowsInserted.connect(self.schedule_estimate)
+        model.rowsRemoved.connect(self.schedule_estimate)
+        model.modelReset.connect(self.schedule_estimate)
         
         grp_out.setLayout(vbox_out)
         layout.addWidget(grp_out)
@@ -615,6 +3624,28 @@ class PDFEditor(QMainWindow):
         hbox_move.addWidget(btn_left)
         hbox_move.addWidget(btn_right)
         vbox.addLayout(hbox_move)
+
+        hbox_move_far = QHBoxLayout()
+        hbox_move_far.setSpacing(2)
+        btn_start = QPushButton("|<< 開頭")
+        btn_start.setToolTip("移至開頭 (Move to start)")
+        btn_start.clicked.connect(self.move_pages_to_start)
+        btn_start.setStyleSheet("background-color: #444444; padding: 8px 5px;")
+
+        btn_pos = QPushButton("位置...")
+        btn_pos.setToolTip("移至指定位置 (Move to position N)")
+        btn_pos.clicked.connect(self.move_pages_to_position_op)
+        btn_pos.setStyleSheet("background-color: #444444; padding: 8px 5px;")
+
+        btn_end = QPushButton("結尾 >>|")
+        btn_end.setToolTip("移至結尾 (Move to end)")
+        btn_end.clicked.connect(self.move_pages_to_end)
+        btn_end.setStyleSheet("background-color: #444444; padding: 8px 5px;")
+
+        hbox_move_far.addWidget(btn_start)
+        hbox_move_far.addWidget(btn_pos)
+        hbox_move_far.addWidget(btn_end)
+        vbox.addLayout(hbox_move_far)
         
         # Undo / Redo Row
         hbox_undo = QHBoxLayout()
@@ -635,6 +3666,11 @@ class PDFEditor(QMainWindow):
         btn_copy.clicked.connect(self.duplicate_pages_op)
         vbox.addWidget(btn_copy)
 
+        btn_range = QPushButton("範圍加入 (Add Range)")
+        btn_range.setToolTip("例: 1-50, 80, 120-  或  2: 1-10; *: 1")
+        btn_range.clicked.connect(self.add_page_range_op)
+        vbox.addWidget(btn_range)
+
         btn_rename = QPushButton("重新命名 (Rename)")
         btn_rename.clicked.connect(lambda: self.rename_page_op(None))
         vbox.addWidget(btn_rename)
@@ -651,7 +3687,6 @@ class PDFEditor(QMainWindow):
 
         layout.addStretch()
         layout.addWidget(QLabel("Copyright © Liyuchiutiger Gongminshen"))
-        return sidebar
 
     # --- Logic ---
 
@@ -665,88 +3700,241 @@ class PDFEditor(QMainWindow):
         if paths:
             self.load_pdfs_to_staging(paths)
 
+    # --- Session Journal ---
+
+    def start_journal(self):
+        if self.journal_active:
+            return
+        sources, records = SessionJournal.replay(self.journal.read())
+        if records:
+            reply = QMessageBox.question(self, "恢復工作階段 (Recover Session)",
+                                         f"上次的工作階段未正常結束，要恢復 {len(records)} 頁嗎?\n"
+                                         f"(The last session did not close cleanly. Recover {len(records)} pages?)")
+            if reply == QMessageBox.Yes:
+                self.recover_session(sources, records)
+
+        # New journal starts from the current state
+        self.compact_journal()
+        model = self.main_list.model()
+        model.rowsInserted.connect(self._journal_inserted)
+        model.rowsRemoved.connect(self._journal_removed)
+        model.rowsMoved.connect(self._journal_moved)
+        model.modelReset.connect(lambda: self._journal_op({'op': 'reset'}))
+        model.dataChanged.connect(self._journal_changed)
+        self.journal_active = True
+
+    def recover_session(self, sources, records):
+        self.status_label.setText("正在恢復工作階段... (Recovering session...)")
+        id_map = {}
+        for old_id, op in sorted(sources.items()):
+            if not os.path.exists(op['path']):
+                continue
+            new_id = self._load_single_pdf(op['path'], recovered_key=op.get('key'))
+            if new_id is not None:
+                id_map[old_id] = new_id
+        page_counts = {entry['id']: len(entry['doc']) for entry in self.source_docs}
+        items_data = [{'doc_id': id_map[doc_id], 'page_num': page_num, 'rotation': rotation, 'text': text}
+                      for doc_id, page_num, rotation, text in records
+                      if doc_id in id_map and page_num < page_counts[id_map[doc_id]]]
+        self.insert_page_items(self.main_list, self.main_list.count(), items_data)
+        self.status_label.setText(f"已恢復 {len(items_data)} 頁 (Recovered {len(items_data)} pages)")
+
+    def _journal_record(self, item):
+        return [item.data(ROLE_DOC), item.data(ROLE_PAGE), item.data(ROLE_ROTATION) or 0, item.text()]
+
+    def _journal_sources(self):
+        return [{'op': 'source', 'id': entry['id'], 'path': entry['path'], 'key': entry.get('key')}
+                for entry in self.source_docs]
+
+    def compact_journal(self):
+        records = [self._journal_record(self.main_list.item(i)) for i in range(self.main_list.count())]
+        self.journal.compact(self._journal_sources(), records)
+
+    def _journaling(self):
+        return self.journal_active and not self._journal_paused
+
+    def _journal_op(self, op):
+        if not self._journaling():
+            return
+        # Merge with the previous op when it continues the same run of rows
+        last = self._journal_pending[-1] if self._journal_pending else None
+        if op['op'] == 'reset':
+            # Unwritten edits before a clear() (which also reports row removals) are moot
+            self._journal_pending = [op]
+        elif last and last['op'] == op['op'] == 'insert' and op['row'] == last['row'] + len(last['items']):
+            last['items'].extend(op['items'])
+        elif last and last['op'] == op['op'] == 'remove' and op['row'] == last['row']:
+            last['count'] += op['count']
+        elif last and last['op'] == op['op'] == 'remove' and op['row'] + op['count'] == last['row']:
+            last['row'] = op['row']
+            last['count'] += op['count']
+        else:
+            self._journal_pending.append(op)
+        if not self.journal_timer.isActive():
+            self.journal_timer.start()
+
+    def flush_journal(self):
+        if self._journal_pending:
+            self.journal.append(self._journal_pending)
+            self._journal_pending = []
+        if self.journal.should_compact():
+            self.compact_journal()
+
+    def _journal_inserted(self, parent, first, last):
+        if not self._journaling():
+            return
+        items = [self._journal_record(self.main_list.item(r)) for r in range(first, last + 1)]
+        self._journal_op({'op': 'insert', 'row': first, 'items': items})
+
+    def _journal_removed(self, parent, first, last):
+        self._journal_op({'op': 'remove', 'row': first, 'count': last - first + 1})
+
+    def _journal_moved(self, parent, start, end, dest_parent, dest_row):
+        self._journal_op({'op': 'move', 'row': start, 'count': end - start + 1, 'dest': dest_row})
+
+    _JOURNAL_ROLES = {Qt.DisplayRole, Qt.EditRole, ROLE_PAGE, ROLE_ROTATION, ROLE_DOC}
+
+    def _journal_changed(self, top_left, bottom_right, roles):
+        # Icons, tooltips and highlights are not part of the composition
+        if not self._journaling() or roles and not self._JOURNAL_ROLES.intersection(roles):
+            return
+        items = [self._journal_record(self.main_list.item(r))
+                 for r in range(top_left.row(), bottom_right.row() + 1)]
+        self._journal_op({'op': 'set', 'row': top_left.row(), 'items': items})
+
     def load_pdfs_to_staging(self, paths):
-        # We start a worker for each, or one worker for all.
+        # Read and parsed on the import pool; added in drop order as they finish
         self.status_label.setText(f"正在載入 {len(paths)} 個檔案...")
-        
-        for path in paths:
-            self._load_single_pdf(path)
+        known = {entry['digest'] for entry in self.source_docs}
+        # Identical files in one drop are opened once
+        self.import_pipeline.submit(list(paths), known, {})
 
-    def _load_single_pdf(self, path):
-        # 1. Register Doc
+    def _read_import(self, path, known_digests, opened):
+        """Import-pool job: read and hash only (no fitz calls)."""
+        return read_source(path, known_digests)
+
+    def _parse_import(self, loaded, known_digests, opened):
+        """Import parse step, on one thread: parse_source plus the thumbnails (doc_id filled in later)."""
+        def add_thumbs(loaded):
+            loaded['thumbs'] = self._gen_thumbnails(loaded['doc'], None)
+        return parse_source(loaded, opened, prepare=add_thumbs)
+
+    def on_import_progress(self, done, total):
+        self.status_label.setText(f"正在載入 {done}/{total} 個檔案 (Loading)...")
+
+    def on_import_finished(self, total, failures):
+        if not failures:
+            self.status_label.setText("已將檔案加入預備區 (Added files to Staging Area)")
+            return
+        self.status_label.setText(f"{len(failures)}/{total} 個檔案無法載入 ({len(failures)} of {total} files failed)")
+        # One report per drop instead of a dialog per file
+        box = QMessageBox(QMessageBox.Warning, "載入失敗 (Import Errors)",
+                          f"{len(failures)}/{total} 個檔案無法載入:\n({len(failures)} of {total} files could not be loaded)\n\n" +
+                          "\n".join(os.path.basename(path) for path, _ in failures[:10]) +
+                          ("\n..." if len(failures) > 10 else ""), parent=self)
+        box.setDetailedText("\n".join(f"{path}: {msg}" for path, msg in failures))
+        box.setAttribute(Qt.WA_DeleteOnClose)
+        box.open()
+
+    def _load_single_pdf(self, path, recovered_key=None):
+        """Loads one file on the GUI thread (session recovery); returns its doc_id or None.
+
+        recovered_key: the journal's thumbnail key from a previous session,
+        reused instead of rendering if the file is unchanged.
+        """
         try:
-            # Read into memory to avoid file lock on Windows which prevents saving/overwriting
-            with open(path, "rb") as f:
-                file_bytes = f.read()
-            
-            # Get extension logic
-            ext = os.path.splitext(path)[1].lower().strip(".")
-            if not ext:
-                ext = "pdf" # Default assumption
-                
-            doc = fitz.open(ext, file_bytes)
-            
-            # Handle Images by converting to PDF in-memory
-            if not doc.is_pdf:
-                try:
-                    pdf_bytes = doc.convert_to_pdf()
-                    doc = fitz.open("pdf", pdf_bytes)
-                    doc.set_metadata({'title': os.path.basename(path)}) # Set title from original filename
-                except Exception as img_err:
-                    print(f"Conversion failed for {path}: {img_err}")
-                    # Try to continue if possible, matches fitz logic
-            
-            doc_id = self.doc_counter
-            self.doc_counter += 1
-            
-            entry = {'doc': doc, 'path': path, 'id': doc_id}
-            self.source_docs.append(entry)
-            
-            # 2. Worker to generate thumbnails
-            worker = PDFWorker(self._gen_thumbnails, doc, doc_id)
-            worker.finished.connect(self._on_thumbnails_ready)
-            worker.run() 
-            
+            known = {entry['digest'] for entry in self.source_docs}
+            return self._register_source(parse_source(read_source(path, known)), recovered_key)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load {path}: {e}")
+            return None
+
+    def _register_source(self, loaded, recovered_key=None):
+        """Registers a read_source result and fills the staging list; returns its doc_id."""
+        path = loaded['path']
+        # The same file again (or a copy elsewhere): reuse its document and thumbnails
+        entry = next((e for e in self.source_docs if e['digest'] == loaded['digest']), None)
+        if entry is not None:
+            doc = loaded.get('doc')
+            if doc is not None and doc is not entry['doc']:
+                doc.close() # Opened by a drop that raced the first one
+            self._add_staging_items(entry['id'], range(len(entry['doc'])))
+            self.status_label.setText(f"已載入相同檔案，重用 Doc {entry['id']} (Identical file, reusing Doc {entry['id']})")
+            return entry['id']
+
+        # 1. Register Doc
+        doc, ext, file_bytes, key = loaded['doc'], loaded['filetype'], loaded['bytes'], loaded['key']
+        doc_id = self.doc_counter
+        self.doc_counter += 1
+
+        entry = {'doc': doc, 'path': path, 'id': doc_id, 'bytes': file_bytes, 'filetype': ext,
+                 'stat': loaded['stat'], 'key': key, 'digest': loaded['digest']}
+        self.source_docs.append(entry)
+        self.tile_renderer.add_source(doc_id, ext, file_bytes)
+        self.thumb_refiner.add_source(doc_id, ext, file_bytes)
+        self.text_indexer.add_source(doc_id, ext, file_bytes)
+        if self.journal_active:
+            self.journal.append([{'op': 'source', 'id': doc_id, 'path': path, 'key': key}])
+
+        # 2. Thumbnails: from the journal when recovering an unchanged file, else from the import pool
+        cached = self.journal.load_thumbnails(key, doc_id) if recovered_key == key else None
+        if cached is not None and len(cached) == len(doc):
+            entry['thumbs_saved'] = True
+            self._on_thumbnails_ready(cached)
+        elif 'thumbs' in loaded:
+            self._on_thumbnails_ready([(doc_id,) + data[1:] for data in loaded['thumbs']])
+        else:
+            self._on_thumbnails_ready(self._gen_thumbnails(doc, doc_id))
+        return doc_id
 
     def _gen_thumbnails(self, doc, doc_id):
         items_data = []
+        grids = []
         for i in range(len(doc)):
             page = doc.load_page(i)
-            # Low res for thumbnail
-            pix = page.get_pixmap(matrix=fitz.Matrix(0.2, 0.2))
+            # Low res for thumbnail; scans may carry one already
+            pix = embedded_thumbnail(page) or render_thumbnail(page)
             img_bytes = pix.tobytes("png")
             items_data.append((doc_id, i, img_bytes))
-        return items_data
+            grids.append(DuplicateIndex.reduce_pixmap(pix))
+        # Hash the whole document in one NumPy pass
+        hashes = DuplicateIndex.hash_grids(grids) if grids else []
+        return [data + (int(h),) for data, h in zip(items_data, hashes)]
 
     def _on_thumbnails_ready(self, items_data):
         if isinstance(items_data, Exception):
             return 
         
-        # Add to Staging List
-        for doc_id, page_num, img_bytes in items_data:
-            # Cache the base image
-            img = QImage.fromData(img_bytes)
-            self.thumbnail_cache.set_image(doc_id, page_num, img)
-            
-            icon = QIcon(QPixmap.fromImage(img))
+        if items_data:
+            doc_id = items_data[0][0]
+            self.duplicate_index.add(doc_id, [d[1] for d in items_data], [d[3] for d in items_data])
+            # Keep the thumbnails with the journal for crash recovery
+            entry = next((e for e in self.source_docs if e['id'] == doc_id), None)
+            if entry and not entry.get('thumbs_saved'):
+                entry['thumbs_saved'] = True
+                self.journal.save_thumbnails(entry['key'], items_data)
+
+        # Cache the base images, then add to the Staging List
+        for doc_id, page_num, img_bytes, _ in items_data:
+            self.thumbnail_cache.set_image(doc_id, page_num, QImage.fromData(img_bytes))
+        if items_data:
+            self._add_staging_items(items_data[0][0], [d[1] for d in items_data])
+        self.status_label.setText("已將檔案加入預備區 (Added files to Staging Area)")
+        self.refine_timer.start()
+
+    def _add_staging_items(self, doc_id, page_nums):
+        for page_num in page_nums:
+            icon = self.page_icon(doc_id, page_num, 0)
             item = QListWidgetItem(icon, f"P{page_num + 1}")
             
-            # STORE DATA
-            # UserRole: Page Index
-            # UserRole+1: Rotation
-            # UserRole+2: Doc ID
-            # UserRole+3: Original Label (if any) - mostly just "P{num}"
-            item.setData(Qt.UserRole, page_num)
-            item.setData(Qt.UserRole + 1, 0)
-            item.setData(Qt.UserRole + 2, doc_id)
+            # STORE DATA (see ROLE_PAGE / ROLE_ROTATION / ROLE_DOC)
+            item.setData(ROLE_PAGE, page_num)
+            item.setData(ROLE_ROTATION, 0)
+            item.setData(ROLE_DOC, doc_id)
             # Tooltip
             item.setToolTip(f"Doc ID: {doc_id} | Page: {page_num + 1}")
             
             self.staging_list.addItem(item)
-            
-        self.status_label.setText("已將檔案加入預備區 (Added files to Staging Area)")
 
     def get_doc_by_id(self, doc_id):
         for entry in self.source_docs:
@@ -754,32 +3942,149 @@ class PDFEditor(QMainWindow):
                 return entry['doc']
         return None
 
+    # --- Preview ---
+
+    def show_preview(self, item):
+        if item is None:
+            self.preview.clear_page()
+            return
+        doc_id = item.data(ROLE_DOC)
+        page_num = item.data(ROLE_PAGE)
+        doc = self.get_doc_by_id(doc_id)
+        if doc is None:
+            self.preview.clear_page()
+            return
+        rect = doc.load_page(page_num).rect
+        base_img = self.thumbnail_cache.get_image(doc_id, page_num)
+        self.preview.set_page(doc_id, page_num, item.data(ROLE_ROTATION) or 0,
+                              (rect.width, rect.height), base_img)
+
+    # --- Search ---
+
+    def _on_doc_indexed(self, doc_id, page_count):
+        self.status_label.setText(f"已建立文字索引: Doc {doc_id} ({page_count} 頁) - 共 {self.text_index.page_count()} 頁")
+        if self.txt_search.text().strip():
+            self.run_search()
+
+    def run_search(self):
+        query = self.txt_search.text().strip()
+        self.search_hits = self.text_index.search(query) if query else set()
+        filter_mode = self.chk_search_filter.isChecked()
+        # Selection belongs to the user: only a new query (not an index
+        # finishing or the filter toggling) replaces it with the hits
+        changed = query != self._search_query
+        select = bool(query) and changed and not filter_mode
+        self._search_query = query
+
+        for target_list in (self.staging_list, self.main_list):
+            target_list.setUpdatesEnabled(False)
+            hit_rows = []
+            for i in range(target_list.count()):
+                item = target_list.item(i)
+                hit = bool(query) and (item.data(ROLE_DOC), item.data(ROLE_PAGE)) in self.search_hits
+                if hit:
+                    hit_rows.append(i)
+                # Filter hides non-matching pages
+                item.setHidden(filter_mode and bool(query) and not hit)
+            if select:
+                target_list.selectionModel().select(rows_selection(target_list.model(), hit_rows),
+                                                    QItemSelectionModel.ClearAndSelect)
+            target_list.setUpdatesEnabled(True)
+            if hit_rows and changed:
+                target_list.scrollToItem(target_list.item(hit_rows[0]))
+
+        if query:
+            self.status_label.setText(f"搜尋 \"{query}\": {len(self.search_hits)} 頁符合")
+
+    def add_search_hits(self):
+        """Appends every staging page matching the search to the main list."""
+        if not self.search_hits:
+            self.status_label.setText("沒有搜尋結果 (No search hits)")
+            return
+        hits = []
+        for i in range(self.staging_list.count()):
+            item = self.staging_list.item(i)
+            if (item.data(ROLE_DOC), item.data(ROLE_PAGE)) in self.search_hits:
+                hits.append(item)
+        if not hits:
+            return
+
+        self.capture_state()
+        self.insert_page_items(self.main_list, self.main_list.count(), [{
+            'doc_id': item.data(ROLE_DOC),
+            'page_num': item.data(ROLE_PAGE),
+            'rotation': item.data(ROLE_ROTATION),
+            'text': item.text()
+        } for item in hits])
+        self.status_label.setText(f"已加入 {len(hits)} 個搜尋結果 (Added search hits)")
+
+    # --- Duplicates ---
+
+    def _duplicate_detail(self, key):
+        img = self.thumbnail_cache.get_image(*key)
+        return DuplicateIndex.detail_grid(img) if img is not None and not img.isNull() else None
+
+    def duplicates_op(self, drop=False):
+        """Selects (or removes) every page that repeats an earlier near-identical
+        page, in both lists. The first page of each group is kept; removing
+        asks first and is one undo step for both lists."""
+        groups = self.duplicate_index.groups(self._duplicate_detail)
+        group_of = {}
+        for gid, group in enumerate(groups):
+            for key in group:
+                group_of[key] = gid
+
+        redundant = {}
+        for target_list in (self.staging_list, self.main_list):
+            seen = set()
+            rows = redundant[target_list] = []
+            for i in range(target_list.count()):
+                item = target_list.item(i)
+                gid = group_of.get((item.data(ROLE_DOC), item.data(ROLE_PAGE)))
+                if gid is None:
+                    continue
+                if gid in seen:
+                    rows.append(i)
+                else:
+                    seen.add(gid)
+        total = sum(len(rows) for rows in redundant.values())
+
+        if drop and total:
+            reply = QMessageBox.question(self, "移除重複頁面 (Drop Duplicates)",
+                                         f"找到 {len(groups)} 組重複頁面，要移除 {total} 頁嗎? (可復原)\n"
+                                         f"(Remove {total} duplicate pages in {len(groups)} groups? Undo restores them.)")
+            if reply != QMessageBox.Yes:
+                return
+            self.capture_state(include_staging=True)
+
+        for target_list, rows in redundant.items():
+            if drop:
+                for row in reversed(rows):
+                    target_list.takeItem(row)
+            else:
+                target_list.selectionModel().select(rows_selection(target_list.model(), rows),
+                                                    QItemSelectionModel.ClearAndSelect)
+                if rows:
+                    target_list.scrollToItem(target_list.item(rows[0]))
+
+        action = "已移除" if drop else "已選取"
+        self.status_label.setText(f"找到 {len(groups)} 組重複頁面，{action} {total} 頁 (Duplicates)")
+
     # --- History & State ---
     
-    def capture_state(self):
-        """Captures the current state of Main List only"""
-        state = []
-        for i in range(self.main_list.count()):
-            item = self.main_list.item(i)
-            data = {
-                'doc_id': item.data(Qt.UserRole + 2),
-                'page_num': item.data(Qt.UserRole),
-                'rotation': item.data(Qt.UserRole + 1),
-                'text': item.text()
-            }
-            state.append(data)
-        self.history.push_state(state)
+    def capture_state(self, include_staging=False):
+        """Captures the current state of Main List (and Staging List if asked)"""
+        self.history.push_state(self.get_current_state_data(include_staging))
 
     def undo_operation(self):
         if not self.history.can_undo():
             self.status_label.setText("沒有動作可復原 (Nothing to Undo)")
             return
         
+        state = self.history.pop_undo()
         # Capture current state to Redo Stack before restoring old state
-        current_state = self.get_current_state_data()
+        current_state = self.get_current_state_data(state.staging is not None)
         self.history.push_to_redo(current_state)
-            
-        state = self.history.pop_undo()
         self.restore_state(state)
         self.status_label.setText("已復原 (Undone)")
 
@@ -788,44 +4093,41 @@ class PDFEditor(QMainWindow):
             self.status_label.setText("沒有動作可重做 (Nothing to Redo)")
             return
             
+        state = self.history.pop_redo()
         # Capture current state to Undo Stack (but don't clear Redo)
-        current_state = self.get_current_state_data()
+        current_state = self.get_current_state_data(state.staging is not None)
         self.history.undo_stack.append(current_state) # Manually append to avoid clearing redo
-            
-        state = self.history.pop_redo()
         self.restore_state(state)
         self.status_label.setText("已重做 (Redone)")
 
-    def get_current_state_data(self):
+    def get_current_state_data(self, include_staging=False):
         """Helper to get state data without pushing to stack"""
-        state = []
-        for i in range(self.main_list.count()):
-            item = self.main_list.item(i)
-            data = {
-                'doc_id': item.data(Qt.UserRole + 2),
-                'page_num': item.data(Qt.UserRole),
-                'rotation': item.data(Qt.UserRole + 1),
-                'text': item.text()
-            }
-            state.append(data)
+        def records(page_list):
+            state = []
+            for i in range(page_list.count()):
+                item = page_list.item(i)
+                data = {
+                    'doc_id': item.data(ROLE_DOC),
+                    'page_num': item.data(ROLE_PAGE),
+                    'rotation': item.data(ROLE_ROTATION),
+                    'text': item.text()
+                }
+                state.append(data)
+            return state
+        state = HistoryState(records(self.main_list))
+        if include_staging:
+            state.staging = records(self.staging_list)
         return state
 
     def restore_state(self, state):
-        self.main_list.clear() # This might trigger signals? No, programmatic changes don't usually invoke drag signals.
-        for data in state:
-            doc_id = data['doc_id']
-            page_num = data['page_num']
-            rotation = data['rotation']
-            text = data.get('text', f"P{page_num+1}")
-            
-            item = QListWidgetItem()
-            item.setText(text)
-            item.setData(Qt.UserRole, page_num)
-            item.setData(Qt.UserRole + 1, rotation)
-            item.setData(Qt.UserRole + 2, doc_id)
-            
-            self.main_list.addItem(item)
-            self.update_item_thumbnail(item)
+        lists = [(self.main_list, state)]
+        if getattr(state, 'staging', None) is not None:
+            lists.append((self.staging_list, state.staging))
+        for page_list, records in lists:
+            # Drop the selection first: clear() otherwise patches the selection ranges for every removed row
+            page_list.selectionModel().clear()
+            page_list.clear() # This might trigger signals? No, programmatic changes don't usually invoke drag signals.
+            self.insert_page_items(page_list, 0, records)
 
     def rotate_pages(self, angle):
         # Check which list is focused or has selection
@@ -849,19 +4151,94 @@ class PDFEditor(QMainWindow):
             self.capture_state()
 
         items = target_list.selectedItems()
+        jobs = []
+        target_list.setUpdatesEnabled(False)
         for item in items:
-            current_rot = item.data(Qt.UserRole + 1) or 0
+            doc_id = item.data(ROLE_DOC)
+            page_num = item.data(ROLE_PAGE)
+            current_rot = item.data(ROLE_ROTATION) or 0
             new_rot = (current_rot + angle) % 360
-            item.setData(Qt.UserRole + 1, new_rot)
+            item.setData(ROLE_ROTATION, new_rot)
+            item.setToolTip(f"Doc: {doc_id} | Page: {page_num+1} | Rot: {new_rot}°")
             
-            # UPDATE VISUAL
-            self.update_item_thumbnail(item)
+            # UPDATE VISUAL: cached icon now, otherwise a placeholder until the worker is done
+            key = (doc_id, page_num, new_rot)
+            icon = self.thumbnail_cache.get_icon(*key)
+            base_img = self.thumbnail_cache.get_image(doc_id, page_num)
+            if icon is None and (new_rot == 0 or base_img is None):
+                self.update_item_thumbnail(item) # Nothing to transform / not cached yet
+                continue
+            if icon is not None:
+                item.setIcon(icon)
+                continue
+
+            item.setIcon(self._placeholder_icon(base_img, new_rot))
+            waiting = self._pending_icons.get(key)
+            if waiting is None:
+                self._pending_icons[key] = [item]
+                jobs.append((key, base_img))
+            else:
+                waiting.append(item)
+        target_list.setUpdatesEnabled(True)
+
+        if jobs:
+            worker = RotationWorker(jobs, self)
+            worker.batchReady.connect(self._on_rotation_batch)
+            worker.finished.connect(lambda: self.rotation_workers.remove(worker))
+            self.rotation_workers.append(worker)
+            worker.start()
+
+        current = target_list.currentItem()
+        if current is not None and current.isSelected():
+            self.show_preview(current)
+
+    def _placeholder_icon(self, base_img, rotation):
+        """Shared blank page icon in the rotated orientation (one per orientation)."""
+        landscape = (base_img.width() > base_img.height()) != (rotation in (90, 270))
+        icon = self._placeholder_icons.get(landscape)
+        if icon is None:
+            w, h = (160, 120) if landscape else (120, 160)
+            pixmap = QPixmap(w, h)
+            pixmap.fill(QColor("#d0d0d0"))
+            painter = QPainter(pixmap)
+            painter.setPen(QColor("#888888"))
+            painter.drawRect(0, 0, w - 1, h - 1)
+            painter.end()
+            icon = QIcon(pixmap)
+            self._placeholder_icons[landscape] = icon
+        return icon
+
+    def _on_rotation_batch(self, batch):
+        for key, img in batch:
+            icon = QIcon(QPixmap.fromImage(img))
+            self.thumbnail_cache.set_icon(*key, icon)
+            for item in self._pending_icons.pop(key, []):
+                try:
+                    # Skip items rotated again or removed (deleted by clear) since the request
+                    if (item.data(ROLE_DOC), item.data(ROLE_PAGE), item.data(ROLE_ROTATION)) == key:
+                        item.setIcon(icon)
+                except RuntimeError:
+                    pass
 
     def update_item_thumbnail(self, item):
-        doc_id = item.data(Qt.UserRole + 2)
-        page_num = item.data(Qt.UserRole)
-        rotation = item.data(Qt.UserRole + 1)
+        doc_id = item.data(ROLE_DOC)
+        page_num = item.data(ROLE_PAGE)
+        rotation = item.data(ROLE_ROTATION)
         
+        icon = self.page_icon(doc_id, page_num, rotation)
+        if icon is not None:
+            item.setIcon(icon)
+            
+            # Update Tooltip
+            item.setToolTip(f"Doc: {doc_id} | Page: {page_num+1} | Rot: {rotation}°")
+
+    def page_icon(self, doc_id, page_num, rotation):
+        """Icon for a page at a rotation; built once and shared by every item showing it."""
+        rotation = rotation or 0
+        icon = self.thumbnail_cache.get_icon(doc_id, page_num, rotation)
+        if icon is not None:
+            return icon
+
         # Get from Cache
         base_img = self.thumbnail_cache.get_image(doc_id, page_num)
         
@@ -870,25 +4247,88 @@ class PDFEditor(QMainWindow):
             doc = self.get_doc_by_id(doc_id)
             if doc:
                  page = doc.load_page(page_num)
-                 pix = page.get_pixmap(matrix=fitz.Matrix(0.2, 0.2))
+                 pix = render_thumbnail(page)
                  base_img = QImage.fromData(pix.tobytes("png"))
                  self.thumbnail_cache.set_image(doc_id, page_num, base_img)
         
-        if base_img:
-            # Rotation Preview
-            if rotation != 0:
-                import PySide6.QtGui
-                tr = PySide6.QtGui.QTransform()
-                tr.rotate(rotation)
-                final_img = base_img.transformed(tr)
-            else:
-                final_img = base_img
-                
-            icon = QIcon(QPixmap.fromImage(final_img))
-            item.setIcon(icon)
+        if not base_img:
+            return None
+
+        # Rotation Preview
+        if rotation != 0:
+            tr = QTransform()
+            tr.rotate(rotation)
+            final_img = base_img.transformed(tr)
+        else:
+            final_img = base_img
             
-            # Update Tooltip
-            item.setToolTip(f"Doc: {doc_id} | Page: {page_num+1} | Rot: {rotation}°")
+        icon = QIcon(QPixmap.fromImage(final_img))
+        self.thumbnail_cache.set_icon(doc_id, page_num, rotation, icon)
+        return icon
+
+    def refine_visible_thumbnails(self):
+        """Swaps in sharp icons for pages on screen and queues the ones still drafts."""
+        if not self.setup_done:
+            return
+        scale = self.devicePixelRatioF()
+        wanted = []
+        for page_list in (self.main_list, self.staging_list):
+            for row in page_list.visible_rows():
+                item = page_list.item(row)
+                doc_id, page_num = item.data(ROLE_DOC), item.data(ROLE_PAGE)
+                if not self.thumbnail_cache.is_sharp(doc_id, page_num, scale):
+                    key = (doc_id, page_num, scale)
+                    if key not in wanted:
+                        wanted.append(key)
+                    continue
+                # Items scrolled into view may still hold the draft icon
+                icon = self.page_icon(doc_id, page_num, item.data(ROLE_ROTATION))
+                if icon is not None and icon.cacheKey() != item.icon().cacheKey():
+                    item.setIcon(icon)
+        self.thumb_refiner.request(wanted)
+
+    def _on_thumbnail_refined(self, key, img):
+        doc_id, page_num, scale = key
+        if self.get_doc_by_id(doc_id) is None:
+            return
+        self.thumbnail_cache.set_image(doc_id, page_num, img, sharp_scale=scale)
+        # Batch the icon swaps for a run of results
+        if not self.refine_timer.isActive():
+            self.refine_timer.start()
+
+    def create_page_item(self, data):
+        """Builds a list item from a page record (doc_id, page_num, rotation, text)."""
+        doc_id = data['doc_id']
+        page_num = data['page_num']
+        rotation = data.get('rotation') or 0
+
+        item = QListWidgetItem()
+        item.setText(data.get('text', f"P{page_num+1}"))
+        item.setData(ROLE_PAGE, page_num)
+        item.setData(ROLE_ROTATION, rotation)
+        item.setData(ROLE_DOC, doc_id)
+
+        icon = self.page_icon(doc_id, page_num, rotation)
+        if icon is not None:
+            item.setIcon(icon)
+        item.setToolTip(f"Doc: {doc_id} | Page: {page_num+1} | Rot: {rotation}°")
+        return item
+
+    def insert_page_items(self, target_list, row, items_data):
+        """Inserts many pages at `row` with view updates paused, so the list
+        lays out once at the end instead of after every insert."""
+        items = [self.create_page_item(data) for data in items_data]
+        target_list.setUpdatesEnabled(False)
+        try:
+            if row >= target_list.count():
+                for item in items:
+                    target_list.addItem(item)
+            else:
+                for offset, item in enumerate(items):
+                    target_list.insertItem(row + offset, item)
+        finally:
+            target_list.setUpdatesEnabled(True)
+        return items
 
     def delete_pages(self):
         # Delete from whichever list is active
@@ -916,12 +4356,26 @@ class PDFEditor(QMainWindow):
             target_list.takeItem(row)
 
     def move_page_left(self):
-        self._move_page_selection(-1)
+        self._move_page_selection(delta=-1)
 
     def move_page_right(self):
-        self._move_page_selection(1)
+        self._move_page_selection(delta=1)
+
+    def move_pages_to_start(self):
+        self._move_page_selection(position=0)
+
+    def move_pages_to_end(self):
+        self._move_page_selection(position=self.main_list.count())
+
+    def move_pages_to_position_op(self):
+        count = self.main_list.count()
+        if count == 0 or not self.main_list.selectedItems():
+            return
+        pos, ok = QInputDialog.getInt(self, "移至位置", f"目標頁位置 (1-{count}):", 1, 1, count)
+        if ok:
+            self._move_page_selection(position=pos - 1)
 
-    def _move_page_selection(self, delta):
+    def _move_page_selection(self, delta=0, position=None):
         # Only for Main List? User said "Modify order... click Left/Right"
         # Usually implies Main List. Staging supports reorder? Maybe.
         # Let's target Main List for now as that's the primary output.
@@ -929,35 +4383,78 @@ class PDFEditor(QMainWindow):
         if not target_list.hasFocus() and len(target_list.selectedItems()) == 0:
             return
 
-        items = target_list.selectedItems()
-        if not items: return
-        
+        self.reorder_selection(target_list, delta=delta, position=position)
+
+    def reorder_selection(self, target_list, delta=0, position=None):
+        """Moves the selected rows (contiguous or not) in a single pass.
+
+        With `position`, the selection is gathered at that index among the
+        unselected rows (0 = start). Otherwise each selected row moves by
+        `delta`, clamped at the list ends. The new order is computed once and
+        the list is rebuilt in one go, so cost is O(n) whatever the selection.
+        Returns True if anything moved (one undo entry is recorded).
+        """
+        sel_model = target_list.selectionModel()
+        rows = sorted({idx.row() for idx in sel_model.selectedIndexes()})
+        if not rows:
+            return False
+        count = target_list.count()
+        selected = set(rows)
+        others = [r for r in range(count) if r not in selected]
+
+        if position is not None:
+            position = max(0, min(position, len(others)))
+            order = others[:position] + rows + others[position:]
+        else:
+            delta = max(-rows[0], min(delta, count - 1 - rows[-1]))
+            if delta == 0:
+                return False # Already at top / bottom
+            order = [None] * count
+            for r in rows:
+                order[r + delta] = r
+            rest = iter(others)
+            for i in range(count):
+                if order[i] is None:
+                    order[i] = next(rest)
+
+        if all(r == i for i, r in enumerate(order)):
+            return False
+
         # Capture Sort Order
-        self.capture_state()
-        
-        # Get rows
-        rows = sorted([target_list.row(item) for item in items])
-        
-        if delta < 0: # Move Up/Left
-            if rows[0] == 0: return # Already at top
-            
-            # Move items one by one from top to bottom index
-            for row in rows:
-                item = target_list.takeItem(row)
-                target_list.insertItem(row - 1, item)
-                item.setSelected(True)
-                
-        else: # Move Down/Right
-            if rows[-1] == target_list.count() - 1: return # Already at bottom
-            
-            # Move items one by one from bottom to top index
-            for row in reversed(rows):
-                item = target_list.takeItem(row)
-                target_list.insertItem(row + 1, item)
-                item.setSelected(True)
-                
+        if target_list == self.main_list:
+            self.capture_state()
+
+        current = target_list.currentItem()
+        # blockSignals does not silence the model, so the journal skips the
+        # rebuild's row by row signals and records one 'order' op instead
+        journaled = target_list is self.main_list and self._journaling()
+        self._journal_paused = journaled
+        target_list.setUpdatesEnabled(False)
+        target_list.blockSignals(True)
+        try:
+            # Drop the selection first: taking selected rows makes Qt patch the
+            # selection ranges on every removal
+            sel_model.clear()
+            # Taking from the end is cheap; re-adding in the new order is one pass
+            items = [target_list.takeItem(r) for r in range(count - 1, -1, -1)]
+            items.reverse()
+            for r in order:
+                target_list.addItem(items[r])
+
+            new_rows = [i for i, r in enumerate(order) if r in selected]
+            sel_model.select(rows_selection(target_list.model(), new_rows), QItemSelectionModel.ClearAndSelect)
+            if current is not None:
+                target_list.setCurrentItem(current, QItemSelectionModel.NoUpdate)
+        finally:
+            target_list.blockSignals(False)
+            target_list.setUpdatesEnabled(True)
+            self._journal_paused = False
+        if journaled:
+            self._journal_op(SessionJournal.order_op(order))
+
         # Scroll to ensure visible
-        target_list.scrollToItem(items[0])
+        target_list.scrollToItem(items[rows[0]])
+        return True
 
     # --- Copy / Paste / Rename / Menu ---
     
@@ -997,6 +4494,11 @@ class PDFEditor(QMainWindow):
             qt_ccw.triggered.connect(lambda: self.rotate_pages(-90))
             menu.addAction(qt_ccw)
 
+            if sender == self.main_list:
+                qt_move = QAction("移至位置 (Move to...)", self)
+                qt_move.triggered.connect(self.move_pages_to_position_op)
+                menu.addAction(qt_move)
+
         menu.exec_(sender.mapToGlobal(pos))
 
     def duplicate_pages_op(self):
@@ -1023,9 +4525,9 @@ class PDFEditor(QMainWindow):
         new_items_data = []
         for item in items:
             data = {
-                'doc_id': item.data(Qt.UserRole + 2),
-                'page_num': item.data(Qt.UserRole),
-                'rotation': item.data(Qt.UserRole + 1),
+                'doc_id': item.data(ROLE_DOC),
+                'page_num': item.data(ROLE_PAGE),
+                'rotation': item.data(ROLE_ROTATION),
                 'text': item.text()
             }
             new_items_data.append(data)
@@ -1039,36 +4541,105 @@ class PDFEditor(QMainWindow):
             # Append to end
             row = self.main_list.count()
             
-        # Create Items
-        for data in new_items_data:
-            doc_id = data['doc_id']
-            page_num = data['page_num']
-            rotation = data['rotation']
-            text = data.get('text', f"P{page_num+1}")
-            
-            # If coming from Staging, use clean text. If from Main, maybe append Copy?
-            # User said "Just duplicate", usually implies Copy of...
-            # But from Staging it means "Add".
-            if source_list == self.staging_list:
-                final_text = text
-            else:
-                 # If it already says (Copy), maybe don't stack it infinitely or do?
-                 final_text = text + " (Copy)"
-            
-            item = QListWidgetItem()
-            item.setText(final_text)
-            item.setData(Qt.UserRole, page_num)
-            item.setData(Qt.UserRole + 1, rotation)
-            item.setData(Qt.UserRole + 2, doc_id)
-            
-            self.main_list.insertItem(row, item)
-            self.update_item_thumbnail(item)
-            row += 1
+        # If coming from Staging, use clean text. If from Main, append (Copy)
+        if source_list == self.main_list:
+            for data in new_items_data:
+                data['text'] = data['text'] + " (Copy)"
+
+        # Create Items in one batch
+        self.insert_page_items(self.main_list, row, new_items_data)
             
         self.status_label.setText(f"已複製/加入 {len(new_items_data)} 頁 (Duplicated/Added)")
         
         # Paste Op Removed
 
+    def add_page_range_op(self, expr=None):
+        """Adds pages selected by a range expression to the end of the main list.
+
+        Segments are separated by ";" and may start with "<doc id>:" or "*:"
+        (every document). Without a prefix the ranges apply to the documents of
+        the selected staging pages (or the only loaded document).
+        """
+        if not self.source_docs:
+            return
+        if expr is None:
+            expr, ok = QInputDialog.getText(self, "範圍加入", "頁碼範圍 (e.g. 1-50, 80, 120-  或  2: 1-10; *: 1):")
+            if not ok or not expr.strip():
+                return
+
+        # Default documents: those of the selected staging pages
+        default_ids = []
+        for item in self.staging_list.selectedItems():
+            doc_id = item.data(ROLE_DOC)
+            if doc_id not in default_ids:
+                default_ids.append(doc_id)
+        if not default_ids and len(self.source_docs) == 1:
+            default_ids = [self.source_docs[0]['id']]
+
+        # Staging items carry the current rotation / name of each page
+        staged = {}
+        for i in range(self.staging_list.count()):
+            item = self.staging_list.item(i)
+            staged.setdefault((item.data(ROLE_DOC), item.data(ROLE_PAGE)), item)
+
+        new_items_data = []
+        try:
+            for segment in expr.split(";"):
+                segment = segment.strip()
+                if not segment:
+                    continue
+                if ":" in segment:
+                    doc_s, ranges = (s.strip() for s in segment.split(":", 1))
+                    doc_ids = [e['id'] for e in self.source_docs] if doc_s == "*" else [int(doc_s)]
+                else:
+                    doc_ids, ranges = default_ids, segment
+                    if not doc_ids:
+                        raise ValueError("請先在預備區選取文件，或使用 \"<Doc ID>: 範圍\"")
+
+                for doc_id in doc_ids:
+                    doc = self.get_doc_by_id(doc_id)
+                    if doc is None:
+                        raise ValueError(f"找不到文件 Doc ID {doc_id}")
+                    for page_num in parse_page_ranges(ranges, len(doc)):
+                        item = staged.get((doc_id, page_num))
+                        new_items_data.append({
+                            'doc_id': doc_id,
+                            'page_num': page_num,
+                            'rotation': item.data(ROLE_ROTATION) if item else 0,
+                            'text': item.text() if item else f"P{page_num + 1}"
+                        })
+        except ValueError as e:
+            QMessageBox.warning(self, "範圍錯誤 (Invalid Range)", str(e))
+            return
+
+        if not new_items_data:
+            return
+
+        self.capture_state()
+        self.insert_page_items(self.main_list, self.main_list.count(), new_items_data)
+        self.main_list.scrollToBottom()
+        self.status_label.setText(f"已加入 {len(new_items_data)} 頁 (Added range)")
+
+    def drop_pages(self, target_list, records, row, source):
+        """Handles a page drag landing on `target_list` at `row`."""
+        if source is target_list:
+            # Internal move: gather the selection at the drop row
+            selected_before = sum(1 for idx in target_list.selectionModel().selectedIndexes() if idx.row() < row)
+            self.reorder_selection(target_list, position=row - selected_before)
+            return
+
+        if target_list == self.main_list:
+            self.capture_state()
+        items = self.insert_page_items(target_list, row, records)
+        if items:
+            # Select the dropped block as one range
+            model = target_list.model()
+            first = target_list.row(items[0])
+            target_list.selectionModel().select(
+                QItemSelection(model.index(first, 0), model.index(first + len(items) - 1, 0)),
+                QItemSelectionModel.ClearAndSelect)
+        self.status_label.setText(f"已加入 {len(items)} 頁 (Dropped)")
+
     def rename_page_op(self, item_arg=None):
         item = item_arg
         if not item:
@@ -1100,24 +4671,19 @@ class PDFEditor(QMainWindow):
         out_path, _ = QFileDialog.getSaveFileName(self, "儲存 PDF", "", "PDF Files (*.pdf)")
         if not out_path: return
         
-        # UI LOCK
-        self.status_label.setText("儲存中... (Saving...)")
-        self.progress_bar.setVisible(True)
-        self.progress_bar.setRange(0, self.main_list.count())
-        self.progress_bar.setValue(0)
-        self.setEnabled(False) # Disable UI
-        
-        # GATHER DATA
+        # SNAPSHOT: the job keeps its own copy of the composition and settings
         items_data = []
         for i in range(self.main_list.count()):
             item = self.main_list.item(i)
             items_data.append({
-                'doc_id': item.data(Qt.UserRole + 2),
-                'page_num': item.data(Qt.UserRole),
-                'rotation': item.data(Qt.UserRole + 1),
+                'doc_id': item.data(ROLE_DOC),
+                'page_num': item.data(ROLE_PAGE),
+                'rotation': item.data(ROLE_ROTATION),
                 'text': item.text() # Pass current name
             })
-            
+
+        sources = self.snapshot_sources({d['doc_id'] for d in items_data})
+
         overlays = {
             'enabled': self.chk_overlay_enable.isChecked(),
             'text': self.txt_overlay.text(),
@@ -1126,34 +4692,312 @@ class PDFEditor(QMainWindow):
             'size': self.spin_size.value()
         }
         
-        # START WORKER
-        self.save_worker = SaveWorker(items_data, self.source_docs, out_path, overlays)
-        self.save_worker.progress.connect(self.on_save_progress)
-        self.save_worker.finished.connect(self.on_save_finished)
-        self.save_worker.start()
+        # SPLIT: one pass over items_data picks the part boundaries
+        rule = SPLIT_RULES[self.combo_split.currentIndex()][0]
+        value = self.spin_split.value()
+        docs_by_id = {entry['id']: entry['doc'] for entry in self.source_docs}
+        if rule == 'size':
+            value *= 1024 * 1024
+        ranges = split_ranges(items_data, rule, value, lambda d: self.size_estimator.page_objects(
+            d['doc_id'], docs_by_id[d['doc_id']], d['page_num']))
 
-    def on_save_progress(self, current, total):
-        self.progress_bar.setValue(current)
-        self.status_label.setText(f"儲存中... {current}/{total}")
+        mode = IMPOSE_MODES[self.combo_impose.currentIndex()][0]
+        impose = {'mode': mode, 'originals': self.chk_impose_originals.isChecked()} if mode else None
 
-    def on_save_finished(self, success, msg):
-        self.setEnabled(True)
-        self.progress_bar.setVisible(False)
-        self.status_label.setText(msg if success else "儲存失敗 (Save Failed)")
-        
-        if success:
-            QMessageBox.information(self, "成功 (Success)", msg)
+        # QUEUE JOB
+        priority = self.combo_priority.currentIndex()
+        name = os.path.basename(out_path)
+        if len(ranges) > 1:
+            name += f" ({len(ranges)} 份 parts)"
+        job_id = self.export_queue.submit(name, priority, sources,
+                                          items_data, out_path, overlays, ranges,
+                                          self.chk_split_numbering.isChecked(), self.chk_verify.isChecked(),
+                                          impose)
+        self._add_job_row(job_id, name, priority, self.export_queue.jobs[job_id]['total'])
+        self.status_label.setText(f"已加入匯出佇列 (Queued): {os.path.basename(out_path)}")
+
+    def schedule_estimate(self, *args):
+        # Restart from the current list once edits pause
+        self.estimate_step_timer.stop()
+        self._estimate_run = None
+        self.estimate_timer.start()
+
+    def start_estimate(self):
+        self._estimate_run = self._estimate_steps()
+        self.estimate_step_timer.start(0)
+
+    def _estimate_step(self):
+        # Time-sliced so long compositions never freeze the window
+        deadline = time.perf_counter() + 0.02
+        try:
+            while time.perf_counter() < deadline:
+                next(self._estimate_run)
+        except StopIteration:
+            self.estimate_step_timer.stop()
+            self._estimate_run = None
+
+    def _estimate_steps(self):
+        """Generator: sums unique objects of the main list, then shows the estimate."""
+        docs_by_id = {entry['id']: entry['doc'] for entry in self.source_docs}
+        objects = {}
+        count = self.main_list.count()
+        for i in range(count):
+            item = self.main_list.item(i)
+            doc_id = item.data(ROLE_DOC)
+            objects.update(self.size_estimator.page_objects(doc_id, docs_by_id[doc_id], item.data(ROLE_PAGE)))
+            if i % 200 == 199:
+                yield
+
+        out_bytes = sum(objects.values()) + 1024 # Header, trailer, page tree root
+        overlay = self.chk_overlay_enable.isChecked() and bool(self.txt_overlay.text())
+        if count and overlay:
+            out_bytes += 120 * count # Overlay text per page
+            index = FontIndex._shared # Only if already loaded; never block on a scan
+            font_file = index.find(set(self.txt_overlay.text()) | set("0123456789")) if index else None
+            if font_file:
+                out_bytes += os.path.getsize(font_file) // 2 # Embedded, deflated
+        seconds = self.throughput.estimate_seconds(count, out_bytes, overlay)
+        self.lbl_estimate.setText(f"預估 (Estimate): 約 {format_size(out_bytes)}, 約 {seconds:.0f} 秒")
+        samples = len(self.throughput.matching(overlay))
+        self.lbl_estimate.setToolTip(f"依本機 {samples} 次匯出的速度 (based on {samples} exports on this machine)"
+                                     if samples else "尚未校準，完成一次匯出後更準確 (uncalibrated until the first export)")
+
+    # --- Resource Usage ---
+
+    def toggle_usage_panel(self, checked):
+        self.usage_widget.setVisible(checked)
+        if checked:
+            self.start_usage_scan()
+            self.usage_timer.start()
         else:
-            QMessageBox.critical(self, "錯誤 (Error)", f"儲存失敗:\n{msg}")
-            
+            # Nothing is measured while the panel is hidden
+            self.usage_timer.stop()
+            self.usage_step_timer.stop()
+            self._usage_run = None
+
+    def start_usage_scan(self):
+        if self._usage_run is not None:
+            return # Previous scan still running
+        self._usage_run = self._usage_steps()
+        self.usage_step_timer.start(0)
+
+    def _usage_step(self):
+        # Time-sliced like the export estimate
+        deadline = time.perf_counter() + 0.02
+        try:
+            while time.perf_counter() < deadline:
+                next(self._usage_run)
+        except StopIteration:
+            self.usage_step_timer.stop()
+            self._usage_run = None
+            self.show_usage()
+
+    def resource_usage(self):
+        """Measures everything at once and returns the dump (for scripts and tests)."""
+        for _ in self._usage_steps():
+            pass
+        return self.usage
+
+    def _usage_steps(self):
+        """Generator: counts list items and history per document, then fills self.usage."""
+        items = {}
+        for name, page_list in (('main_items', self.main_list), ('staging_items', self.staging_list)):
+            counts = items[name] = {}
+            i = 0
+            while True:
+                item = page_list.item(i) # Re-checked each step; the list may change between slices
+                if item is None:
+                    break
+                doc_id = item.data(ROLE_DOC)
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+                i += 1
+                if i % 2000 == 0:
+                    yield
+        for state in self.history.undo_stack + self.history.redo_stack:
+            self.history.measure(state) # Each new snapshot once, one per slice
+            yield
+
+        history = self.history.usage()
+        thumbs = self.thumbnail_cache.usage()
+        worker_handles = {}
+        for doc_id in self.tile_renderer.open_doc_ids() + self.thumb_refiner.open_doc_ids():
+            worker_handles[doc_id] = worker_handles.get(doc_id, 0) + 1
+        documents = []
+        for entry in self.source_docs:
+            doc_id = entry['id']
+            row = {'id': doc_id, 'path': entry['path'], 'pages': len(entry['doc']),
+                   'raw_bytes': len(entry['bytes']),
+                   'handles': 1 + worker_handles.get(doc_id, 0)} # The editor's own plus the renderers'
+            row.update(thumbs.get(doc_id, dict.fromkeys(('thumbs', 'thumb_bytes', 'icons', 'icon_bytes'), 0)))
+            row['main_items'] = items['main_items'].get(doc_id, 0)
+            row['staging_items'] = items['staging_items'].get(doc_id, 0)
+            row['history_records'] = history['records'].get(doc_id, 0)
+            documents.append(row)
+        totals = {key: sum(row[key] for row in documents) for key, _ in USAGE_COLUMNS[1:]}
+        tiles, tile_bytes = self.preview.cache.usage()
+        self.usage = {
+            'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'rss_bytes': process_rss(),
+            'documents': documents,
+            'totals': totals,
+            'history': {'snapshots': history['snapshots'], 'bytes': history['bytes']},
+            'preview_tiles': {'count': tiles, 'bytes': tile_bytes},
+            'running_exports': self.export_queue.running_count(), # Separate processes, not in RSS
+        }
 
+    def show_usage(self):
+        usage = self.usage
+        rows = usage['documents'] + [dict(usage['totals'], path="總計 (Total)")]
+        self.usage_table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            for c, (key, _) in enumerate(USAGE_COLUMNS):
+                if key == 'path':
+                    text = os.path.basename(row['path'])
+                elif key.endswith('_bytes'):
+                    text = format_size(row[key])
+                else:
+                    text = str(row[key])
+                cell = QTableWidgetItem(text)
+                if key == 'path':
+                    cell.setToolTip(row['path'])
+                self.usage_table.setItem(r, c, cell)
+        rss = usage['rss_bytes']
+        self.lbl_usage.setText(
+            f"RSS: {format_size(rss) if rss is not None else 'N/A'} | "
+            f"預覽圖塊 (Tiles): {usage['preview_tiles']['count']} / {format_size(usage['preview_tiles']['bytes'])} | "
+            f"歷史 (History): {usage['history']['snapshots']} 快照 / {format_size(usage['history']['bytes'])} | "
+            f"匯出中 (Exporting): {usage['running_exports']}")
 
+    def save_usage_dump(self):
+        path, _ = QFileDialog.getSaveFileName(self, "匯出資源使用 (Save Usage)", "usage.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.resource_usage(), f, ensure_ascii=False, indent=2)
+            self.show_usage()
+        except OSError as e:
+            QMessageBox.critical(self, "錯誤 (Error)", f"無法儲存 (Could not save):\n{e}")
+
+    def snapshot_sources(self, doc_ids):
+        """Source specs for an export; the job opens its own documents from them.
+
+        Files unchanged since import are passed by path so the worker reads
+        them itself, with the loaded bytes as a fallback should the file change
+        before the worker opens it; converted images and files changed on disk
+        since import pass the bytes loaded into the editor.
+        """
+        sources = {}
+        for entry in self.source_docs:
+            if entry['id'] not in doc_ids:
+                continue
+            if entry.get('stat'):
+                try:
+                    st = os.stat(entry['path'])
+                    if (st.st_size, st.st_mtime_ns) == entry['stat']:
+                        sources[entry['id']] = ('file', entry['path'], entry['stat'],
+                                                ('data', entry['filetype'], entry['bytes']))
+                        continue
+                except OSError:
+                    pass # Moved or deleted; fall back to the loaded bytes
+            sources[entry['id']] = ('data', entry['filetype'], entry['bytes'])
+        return sources
+
+    def _add_job_row(self, job_id, name, priority, total):
+        row = self.jobs_table.rowCount()
+        self.jobs_table.insertRow(row)
+        self.jobs_table.setItem(row, 0, QTableWidgetItem(name))
+        self.jobs_table.setItem(row, 1, QTableWidgetItem(EXPORT_PRIORITIES[priority]))
+        self.jobs_table.setItem(row, 2, QTableWidgetItem("等待中 (Queued)"))
+        bar = QProgressBar()
+        bar.setRange(0, total)
+        bar.setValue(0)
+        bar.setStyleSheet("QProgressBar { border: 1px solid #3e3e42; border-radius: 5px; text-align: center; } QProgressBar::chunk { background-color: #007acc; }")
+        self.jobs_table.setCellWidget(row, 3, bar)
+        btn_cancel = QPushButton("取消 (Cancel)")
+        btn_cancel.clicked.connect(lambda: self.export_queue.cancel(job_id))
+        self.jobs_table.setCellWidget(row, 4, btn_cancel)
+        self.job_rows[job_id] = self.jobs_table.item(row, 0)
+        self.jobs_widget.setVisible(True)
+
+    def _job_row(self, job_id):
+        item = self.job_rows.get(job_id)
+        return item.row() if item else -1
+
+    def clear_finished_jobs(self):
+        for job_id, job in list(self.export_queue.jobs.items()):
+            if job['state'] in ('done', 'failed', 'cancelled'):
+                row = self._job_row(job_id)
+                if row >= 0:
+                    self.jobs_table.removeRow(row)
+                del self.job_rows[job_id]
+                del self.export_queue.jobs[job_id]
+        self.jobs_widget.setVisible(self.jobs_table.rowCount() > 0)
+
+    def on_save_started(self, job_id):
+        row = self._job_row(job_id)
+        if row >= 0:
+            self.jobs_table.item(row, 2).setText("匯出中 (Running)")
+
+    def on_save_progress(self, job_id, current, total):
+        status = self.export_queue.status(job_id)
+        stage = EXPORT_STAGES.get(status['stage'], "")
+        row = self._job_row(job_id)
+        if row >= 0:
+            self.jobs_table.cellWidget(row, 3).setValue(current)
+            self.jobs_table.item(row, 2).setText(stage or "匯出中 (Running)")
+        eta = f"剩餘約 {status['eta']:.0f} 秒 (ETA)" if status['eta'] is not None else ""
+        self.status_label.setText(
+            f"儲存中 {stage} {current}/{total} | {status['pages_per_second']:.0f} 頁/秒 (pages/s) | "
+            f"已拼接 {format_size(status['grafted'])} (grafted) | {eta}".rstrip(" |"))
+
+    def on_save_verifying(self, job_id):
+        row = self._job_row(job_id)
+        if row >= 0:
+            self.jobs_table.item(row, 2).setText("驗證中 (Verifying)")
+
+    def on_save_finished(self, job_id, state, msg):
+        row = self._job_row(job_id)
+        if row >= 0:
+            labels = {'done': "完成 (Done)", 'failed': "失敗 (Failed)", 'cancelled': "已取消 (Cancelled)"}
+            mismatches = self.export_queue.jobs[job_id]['mismatches']
+            if state == 'done' and mismatches:
+                # Listed on the row rather than in a dialog, so work is not interrupted
+                labels['done'] = "完成，有不符頁 (Done, mismatches)"
+                self.jobs_table.item(row, 2).setToolTip("\n".join(
+                    f"{name} P{page}: {reason}" if page > 0 else f"{name}: {reason}"
+                    for name, page, reason in sorted(mismatches)[:50]))
+            self.jobs_table.item(row, 2).setText(labels[state])
+            if state == 'done':
+                bar = self.jobs_table.cellWidget(row, 3)
+                bar.setValue(bar.maximum())
+            self.jobs_table.cellWidget(row, 4).setEnabled(False)
+
+        if state == 'done':
+            self.status_label.setText(msg.replace("\n", " "))
+            job = self.export_queue.jobs[job_id]
+            overlays = job['overlays']
+            self.throughput.record(job['pages'], job['out_bytes'], job.get('seconds', 0),
+                                   overlays['enabled'] and bool(overlays['text']))
+            self.schedule_estimate()
+        elif state == 'failed':
+            self.status_label.setText("儲存失敗 (Save Failed)")
+            QMessageBox.critical(self, "錯誤 (Error)", f"儲存失敗:\n{msg}")
+        else:
+            self.status_label.setText(msg)
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # Process pools in the frozen exe
+    if "--watch" in sys.argv:
+        watch_main(sys.argv[1:])
+        sys.exit(0)
     app = QApplication(sys.argv)
     font = QFont("Microsoft JhengHei", 10)
     app.setFont(font)
+    STARTUP.mark("QApplication")
     window = PDFEditor()
+    STARTUP.mark("main window")
     window.show()
+    STARTUP.mark("show")
     sys.exit(app.exec())
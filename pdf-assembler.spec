@@ -1,9 +1,14 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
 from PyInstaller.utils.hooks import collect_all
 
+# PDF_ASSEMBLER_ONEDIR=1 builds an unpacked folder (faster start) instead of a single exe
+onedir = os.environ.get('PDF_ASSEMBLER_ONEDIR') == '1'
+
 datas = []
 binaries = []
-hiddenimports = ['PySide6.QtXml']
+# numpy is only imported lazily (importlib), which the analysis cannot see
+hiddenimports = ['PySide6.QtXml', 'numpy']
 tmp_ret = collect_all('fitz')
 datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
 
@@ -26,9 +31,9 @@ pyz = PYZ(a.pure)
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
+    *([] if onedir else [a.binaries, a.datas]),
     [],
+    exclude_binaries=onedir,
     name='pdf-assembler',
     debug=False,
     bootloader_ignore_signals=False,
@@ -43,3 +48,14 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+
+if onedir:
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        name='pdf-assembler',
+    )
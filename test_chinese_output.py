@@ -8,26 +8,12 @@ def test_chinese_output():
     text = "測試頁面 name"
     print(f"Testing text: {text}")
     
-    font_paths = [
-        "C:/Windows/Fonts/msjh.ttc", # Microsoft JhengHei
-        "C:/Windows/Fonts/msyh.ttc", # Microsoft YaHei
-        "C:/Windows/Fonts/simsun.ttc", # SimSun
-        "C:/Windows/Fonts/arial.ttf" # Fallback
-    ]
-    
-    font_file_used = None
-    for fp in font_paths:
-        if os.path.exists(fp):
-            print(f"Found font: {fp}")
-            try:
-                # Try to load it to see if it works
-                font = fitz.Font(fontfile=fp)
-                font_file_used = fp
-                print(f"Successfully loaded font: {fp}")
-                break
-            except Exception as e:
-                print(f"Failed to load font {fp}: {e}")
-                
+    # Same lookup the overlay renderer uses: the cached system font index
+    from main import FontIndex
+    font_file_used = FontIndex.shared().find(text)
+    if font_file_used:
+        print(f"Found font covering text: {font_file_used}")
+
     p = fitz.Point(100, 100)
     
     try:
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import fitz
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import main
+
+
+@pytest.mark.parametrize("rotation", [0, 90, 180, 270])
+def test_overlay_on_rotated_cropped_page(tmp_path, rotation):
+    # A cropbox moves the visible page away from the mediabox origin
+    src = fitz.open()
+    page = src.new_page(width=595, height=842)
+    page.set_cropbox(fitz.Rect(10, 20, 500, 800))
+    page.set_rotation(rotation)
+    out_path = str(tmp_path / "out.pdf")
+    layout = main.OverlayLayout({'enabled': True, 'text': "PN{n}", 'pos': 'Bottom-Left', 'size': 12})
+    main.assemble_pdf([{'doc_id': 0, 'page_num': 0, 'rotation': 0, 'text': "P1"}], {0: src}, out_path, layout)
+
+    out = fitz.open(out_path)[0]
+    words = [w for w in out.get_text("words") if w[4] == "PN1"]
+    assert words, "overlay text missing from the visible page"
+    visual = fitz.Rect(words[0][:4]) * out.rotation_matrix
+    assert visual in out.rect
+    # Bottom-left of the page as shown
+    assert visual.x0 == pytest.approx(main.OVERLAY_MARGIN, abs=1)
+    assert out.rect.height - visual.y1 < main.OVERLAY_MARGIN + 12
@@ -0,0 +1,196 @@
+"""Headless timing tests for PDFEditor list operations.
+
+Drives the editor under Qt's offscreen platform with synthetic compositions
+of 1k, 10k and 50k pages (all pointing at one small generated PDF, so the
+cost measured is the editor's, not rendering). Each operation fails when it
+takes longer than its limit in perf_thresholds.json.
+
+Limits are stored as multiples of a calibration run (a fixed QListWidget
+workload timed once per session), not as seconds, so they hold on faster
+and slower machines alike.
+
+Run:            python -m pytest -q test_ui_performance.py
+Re-baseline:    PDF_ASSEMBLER_PERF_UPDATE=1 python -m pytest -q test_ui_performance.py
+                (stores 3x the measured ratios as the new limits)
+"""
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import fitz
+import pytest
+from PySide6.QtCore import QItemSelection, QItemSelectionModel
+from PySide6.QtWidgets import QApplication, QListWidget, QListWidgetItem
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import main
+
+SIZES = [1000, 10000, 50000]
+SOURCE_PAGES = 10
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perf_thresholds.json")
+UPDATE = os.environ.get("PDF_ASSEMBLER_PERF_UPDATE") == "1"
+HEADROOM = 3 # Limit = measured ratio x HEADROOM when re-baselining
+MIN_LIMIT = 0.2 # Floor for stored limits, in calibration runs; tiny timings are mostly noise
+CALIBRATION_ITEMS = 20000
+
+with open(THRESHOLDS_PATH, "r", encoding="utf-8") as f:
+    THRESHOLDS = json.load(f)
+_measured = {}
+_calibration = []
+
+
+def calibration_seconds():
+    """Best of three runs of a fixed list workload: add, read back and clear items."""
+    if not _calibration:
+        page_list = QListWidget()
+        runs = []
+        for _ in range(3):
+            start = time.perf_counter()
+            for i in range(CALIBRATION_ITEMS):
+                page_list.addItem(QListWidgetItem(f"P{i + 1}"))
+            [page_list.item(i).text() for i in range(page_list.count())]
+            page_list.clear()
+            runs.append(time.perf_counter() - start)
+        _calibration.append(min(runs))
+    return _calibration[0]
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture(scope="module")
+def home(tmp_path_factory):
+    """Keeps the journal, caches and logs out of the user's profile, in pytest's temp dir."""
+    previous = os.environ.get("PDF_ASSEMBLER_HOME")
+    os.environ["PDF_ASSEMBLER_HOME"] = str(tmp_path_factory.mktemp("home"))
+    yield os.environ["PDF_ASSEMBLER_HOME"]
+    if previous is None:
+        del os.environ["PDF_ASSEMBLER_HOME"]
+    else:
+        os.environ["PDF_ASSEMBLER_HOME"] = previous
+
+
+@pytest.fixture(scope="module")
+def editor(app, home, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("perf") / "source.pdf")
+    doc = fitz.open()
+    for i in range(SOURCE_PAGES):
+        page = doc.new_page(width=595, height=842 if i % 3 else 595)
+        page.insert_text((72, 72), f"Page {i + 1}", fontsize=24)
+    doc.save(path)
+
+    window = main.PDFEditor()
+    # Not shown, so run what showing the window would: services and the crash journal
+    window.finish_setup()
+    window.start_journal()
+    assert window.journal_active
+    window.doc_id = window._load_single_pdf(path)
+    yield window
+    window.close() # Flushes and closes the journal, stops the workers
+    window.deleteLater()
+
+
+def composition(editor, n):
+    return [{'doc_id': editor.doc_id, 'page_num': i % SOURCE_PAGES, 'rotation': 0, 'text': f"P{i + 1}"}
+            for i in range(n)]
+
+
+def fill_main(editor, n):
+    editor.restore_state(composition(editor, n))
+    editor.history.undo_stack.clear()
+    QApplication.processEvents()
+
+
+def select_every(page_list, step):
+    """Selects every step-th row (a scattered selection, the slow case)."""
+    model = page_list.model()
+    selection = QItemSelection()
+    for row in range(0, page_list.count(), step):
+        index = model.index(row, 0)
+        selection.select(index, index)
+    page_list.selectionModel().select(selection, QItemSelectionModel.ClearAndSelect)
+
+
+def timed(name, n, func):
+    """Runs func plus the layout/paint events it queued; fails above the limit."""
+    unit = calibration_seconds()
+    start = time.perf_counter()
+    func()
+    QApplication.processEvents()
+    seconds = time.perf_counter() - start
+    _measured.setdefault(name, {})[str(n)] = seconds / unit
+    limit = THRESHOLDS.get(name, {}).get(str(n))
+    if not UPDATE and limit is not None:
+        assert seconds <= limit * unit, (f"{name} with {n} pages took {seconds:.3f}s, {seconds / unit:.2f} "
+                                         f"calibration runs (limit {limit:.2f} = {limit * unit:.3f}s)")
+    return seconds
+
+
+def teardown_module(module):
+    if not UPDATE:
+        return
+    for name, sizes in _measured.items():
+        for n, ratio in sizes.items():
+            THRESHOLDS.setdefault(name, {})[n] = round(max(ratio * HEADROOM, MIN_LIMIT), 2)
+    with open(THRESHOLDS_PATH, "w", encoding="utf-8") as f:
+        json.dump(THRESHOLDS, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_populate_staging(editor, n):
+    editor.staging_list.clear()
+    timed("populate_staging", n,
+          lambda: editor._add_staging_items(editor.doc_id, [i % SOURCE_PAGES for i in range(n)]))
+    assert editor.staging_list.count() == n
+    editor.staging_list.clear()
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_capture_state(editor, n):
+    fill_main(editor, n)
+    timed("capture_state", n, editor.capture_state)
+    assert len(editor.history.undo_stack[-1]) == n
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_restore_state(editor, n):
+    fill_main(editor, n)
+    state = composition(editor, n)[::-1]
+    timed("restore_state", n, lambda: editor.restore_state(state))
+    assert editor.main_list.count() == n
+    assert editor.main_list.item(0).text() == f"P{n}"
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_duplicate_pages(editor, n):
+    fill_main(editor, n)
+    select_every(editor.main_list, 10)
+    timed("duplicate_pages_op", n, editor.duplicate_pages_op)
+    assert editor.main_list.count() == n + n // 10
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_move_selection(editor, n):
+    fill_main(editor, n)
+    select_every(editor.main_list, 10)
+    timed("move_page_selection", n, lambda: editor._move_page_selection(delta=1))
+    assert editor.main_list.item(1).text() == "P1"
+    timed("move_page_selection_to_end", n, lambda: editor._move_page_selection(position=n))
+    assert editor.main_list.item(n - 1).text() == f"P{n - 9}"
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_rotate_pages(editor, n):
+    fill_main(editor, n)
+    select_every(editor.main_list, 10)
+    timed("rotate_pages", n, lambda: editor.rotate_pages(90))
+    for worker in list(editor.rotation_workers):
+        worker.wait()
+    QApplication.processEvents()
+    assert editor.main_list.item(0).data(main.ROLE_ROTATION) == 90